@@ -1,17 +1,10 @@
 from django import forms
-from dit_email_addon.api import DitEmailAddon
-from django.conf import settings
 from crispy_forms.helper import Layout, FormHelper
 from crispy_forms.layout import Submit
 from crispy_forms.bootstrap import Div
 from django.contrib import messages
 from wagtailhyper.forms import HyperForm
-import threading
-
-def send_email_async(data):
-    contact_email = getattr(settings, 'CONTACT_EMAIL', 'shimul@divine-it.net')
-    DitEmailAddon().send_email_default(contact_email, 'contact', data)
-    DitEmailAddon().send_email_default(data['email'], 'contact_reply', data)
+from base.outbox import enqueue_contact_emails
 
 class ContactForm(HyperForm):
     name = forms.CharField(max_length=255, label='', widget=forms.TextInput(attrs={'placeholder': 'Name'}) )
@@ -42,7 +35,8 @@ class ContactForm(HyperForm):
 
     def is_valid(self):
         if super().is_valid():
-            threading.Thread(target=send_email_async, args=[self.data]).start()
+            # only the declared fields, never the raw POST with its csrf token or anything else sent along
+            enqueue_contact_emails({name: self.cleaned_data.get(name) for name in self.fields})
             messages.success(self.request, 'Your message has been sent successfully.')
             return True
         else:
@@ -0,0 +1,55 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+LABEL_CACHE = getattr(settings, 'LABEL_CACHE', 'default')
+
+# header and footer snippets can be shown on every site, any change to one of them changes every page
+SNIPPETS_LABEL = 'snippets'
+
+"""
+Versioned cache labels.
+
+Cached responses and ETags depend on a few labels, e.g. 'blog:3',
+'tag:django' or 'site:1'. Each label has a version stored in the cache and
+the versions are part of the cache key or ETag, so bumping a label (see
+invalidate) drops exactly what depends on it without having to know the keys.
+The versions must live in a cache shared by every worker process (see
+CACHES in settings), otherwise a bump is only seen by the process making it.
+"""
+
+
+def get_cache():
+    return caches[LABEL_CACHE]
+
+
+def label_key(label):
+    return 'label:%s' % label
+
+
+def get_versions(labels):
+    cache = get_cache()
+    keys = [label_key(label) for label in labels]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*labels):
+    get_cache().set_many({label_key(label): uuid.uuid4().hex for label in labels}, None)
+
+
+def site_label(site_id):
+    return 'site:%s' % site_id
+
+
+# labels every page of the request's site depends on: its settings (theme, header and footer) and the snippets
+def site_labels(request):
+    site = getattr(request, 'site', None)
+    if site is None:
+        return [SNIPPETS_LABEL]
+    return [site_label(site.pk), SNIPPETS_LABEL]
@@ -1,6 +1,9 @@
+import os
+
 from django.conf import settings
+from django.template.loaders.cached import Loader as CachedLoader
 from django.template.loaders.filesystem import Loader
-from django.template import Origin, TemplateDoesNotExist
+from django.template import Origin, Template, TemplateDoesNotExist
 from django.utils._os import safe_join
 from base import utils
 
@@ -13,7 +16,7 @@ class ThemeLoader(Loader):
     def get_template_sources(self, template_name):
 
         theme_dirs = [
-            utils.CURRENT_THEME,
+            utils.get_current_theme(),
             'default'
         ]
 
@@ -30,4 +33,54 @@ class ThemeLoader(Loader):
                 name=name,
                 template_name=template_name,
                 loader=self,
-            )
\ No newline at end of file
+            )
+
+
+"""Cached loader that is safe to use with themes.
+
+Compiled templates and failed lookups are cached per (theme, template name),
+so a template is compiled and its file looked up once per process and theme.
+With autoreload the file of a cached template is stat'ed on every lookup and
+reloaded when it changed, meant for development.
+
+    'loaders': [
+        ('base.loaders.CachedThemeLoader', [
+            ('base.loaders.ThemeLoader', os.path.join(PROJECT_DIR, 'themes')),
+            'django.template.loaders.app_directories.Loader',
+        ], DEBUG),
+    ]
+"""
+class CachedThemeLoader(CachedLoader):
+
+    def __init__(self, engine, loaders, autoreload=False):
+        super().__init__(engine, loaders)
+        self.autoreload = autoreload
+        self.mtimes = {}
+
+    def cache_key(self, template_name, skip=None):
+        return '%s:%s' % (utils.get_current_theme(), super().cache_key(template_name, skip))
+
+    def get_template(self, template_name, skip=None):
+        if self.autoreload:
+            key = self.cache_key(template_name, skip)
+            cached = self.get_template_cache.get(key)
+            if isinstance(cached, Template) and self.mtimes.get(key) != self.get_mtime(cached.origin):
+                del self.get_template_cache[key]
+            elif cached is not None and not isinstance(cached, Template):
+                # without a file to watch, a missing template is looked up again
+                del self.get_template_cache[key]
+
+        template = super().get_template(template_name, skip)
+        if self.autoreload:
+            self.mtimes[self.cache_key(template_name, skip)] = self.get_mtime(template.origin)
+        return template
+
+    def get_mtime(self, origin):
+        try:
+            return os.stat(origin.name).st_mtime
+        except (OSError, TypeError):
+            return None
+
+    def reset(self):
+        super().reset()
+        self.mtimes.clear()
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base.outbox import drain, queue_depth
+
+
+class Command(BaseCommand):
+    help = 'Send pending outbox emails, retrying failed ones with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='store_true', help='Only print the number of pending messages')
+        parser.add_argument('--loop', type=int, default=0, help='Keep draining every LOOP seconds')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.stdout.write('%d messages pending' % queue_depth())
+            return
+
+        while True:
+            sent, failed = drain()
+            self.stdout.write('Sent %d, failed %d, %d pending' % (sent, failed, queue_depth()))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
@@ -1,15 +1,14 @@
 import re
 
-from django.conf import settings
 from django.utils import translation
+from django.utils.cache import patch_vary_headers
 from django.utils.encoding import force_text
-from django.utils.html import strip_spaces_between_tags
 
 from base import utils
-from base.models import ApplicationSettings
+from base.minify import (COMPRESS_HTML, COMPRESS_MIN_LENGTH, accepted_encoding, cached_compress,
+                         compress, compress_stream, minify, minify_stream)
 
-RE_MULTISPACE = re.compile(r"\s{2,}")
-RE_NEWLINE = re.compile(r"\n")
+RE_STRONG_ETAG = re.compile(r'^"')
 
 def MinifyHTMLMiddleware(get_response):
     # One-time configuration and initialization.
@@ -17,11 +16,39 @@ def MinifyHTMLMiddleware(get_response):
     def middleware(request):
         response = get_response(request)
 
-        if 'text/html' in response.get('Content-Type', []) and settings.COMPRESS_HTML:
-            response.content = strip_spaces_between_tags(response.content)
-            # response.content = RE_MULTISPACE.sub(" ", force_text(response.content))
-            # response.content = RE_NEWLINE.sub("", force_text(response.content))
+        if 'text/html' not in response.get('Content-Type', []) or response.has_header('Content-Encoding'):
+            return response
+
+        # responses served from the response cache were minified before they were stored
+        if COMPRESS_HTML and not getattr(response, 'minified', False):
+            if response.streaming:
+                response.streaming_content = minify_stream(response.streaming_content, response.charset)
+            else:
+                response.content = minify(response.content.decode(response.charset)).encode(response.charset)
+                response['Content-Length'] = len(response.content)
+
+        encoding = accepted_encoding(request)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if encoding is None or response.status_code != 200:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            if len(response.content) < COMPRESS_MIN_LENGTH:
+                return response
+            cache_key = getattr(response, 'cache_key', None)
+            if cache_key is None:
+                response.content = compress(response.content, encoding)
+            else:
+                response.content = cached_compress(response.content, encoding, cache_key)
             response['Content-Length'] = len(response.content)
+
+        # the body changed, so a strong ETag of the uncompressed body can only be a weak one now
+        if response.has_header('ETag'):
+            response['ETag'] = RE_STRONG_ETAG.sub('W/"', response['ETag'])
+        response['Content-Encoding'] = encoding
         return response
 
     return middleware
@@ -32,9 +59,15 @@ def ThemeMiddleware(get_response):
     # One-time configuration and initialization.
 
     def middleware(request):
-        utils.CURRENT_THEME = ApplicationSettings.for_site(request.site).theme
-        response = get_response(request)
-        return response
+        theme = utils.DEFAULT_THEME
+        if getattr(request, 'site', None) is not None:
+            theme = utils.get_application_settings(request.site).theme
+
+        token = utils.set_current_theme(theme)
+        try:
+            return get_response(request)
+        finally:
+            utils.reset_current_theme(token)
 
     return middleware
 
@@ -0,0 +1,20 @@
+# Generated by Django 2.0.9 on 2018-10-18 14:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0002_auto_20181009_1728'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='basicsnippet',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,172 @@
+import codecs
+import re
+import zlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# content of these tags is passed through untouched
+PRESERVED_TAGS = ('pre', 'textarea', 'script', 'style')
+
+RE_TAG = re.compile(r'<[^>"\']*(?:(?:"[^"]*"|\'[^\']*\')[^>"\']*)*>')
+RE_TAG_NAME = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)')
+RE_SPACES = re.compile(r'\s+')
+RE_GZIP = re.compile(r'\bgzip\b')
+RE_BROTLI = re.compile(r'\bbr\b')
+
+COMPRESS_HTML = getattr(settings, 'COMPRESS_HTML', False)
+COMPRESS_MIN_LENGTH = getattr(settings, 'COMPRESS_MIN_LENGTH', 200)
+COMPRESS_CACHE_TIMEOUT = getattr(settings, 'COMPRESS_CACHE_TIMEOUT', 60 * 60)
+
+
+"""
+Single pass HTML minifier that can be fed a document in chunks.
+
+Whitespace only text between tags is dropped (like strip_spaces_between_tags),
+other runs of whitespace become one space and comments are removed, except
+conditional comments. Everything inside <pre>, <textarea>, <script> and
+<style> is left as it is. Input that may continue in the next chunk (an
+unfinished tag, trailing text) is held back until more data or close().
+"""
+class HTMLMinifier(object):
+
+    def __init__(self):
+        self.pending = ''
+        self.preserved = None
+
+    def feed(self, data):
+        self.pending += data
+        return self._process(final=False)
+
+    def close(self):
+        return self._process(final=True)
+
+    def _process(self, final):
+        text = self.pending
+        out = []
+        pos = 0
+
+        while pos < len(text):
+            if self.preserved:
+                end = text.lower().find('</' + self.preserved, pos)
+                if end == -1:
+                    # keep enough back to find a closing tag split over two chunks
+                    safe = len(text) if final else max(pos, len(text) - len(self.preserved) - 2)
+                    out.append(text[pos:safe])
+                    pos = safe
+                    break
+                out.append(text[pos:end])
+                pos = end
+                self.preserved = None
+                continue
+
+            start = text.find('<', pos)
+            if start == -1:
+                if final:
+                    out.append(self._text(text[pos:]))
+                    pos = len(text)
+                break
+            if start > pos:
+                out.append(self._text(text[pos:start]))
+                pos = start
+
+            if text.startswith('<!--', start):
+                end = text.find('-->', start)
+                if end == -1:
+                    break
+                comment = text[start:end + 3]
+                if comment.startswith('<!--[if') or comment.startswith('<!--<![endif]'):
+                    out.append(comment)
+                pos = end + 3
+                continue
+
+            match = RE_TAG.match(text, start)
+            if match is None:
+                break
+            tag = match.group(0)
+            out.append(tag)
+            pos = match.end()
+
+            name = RE_TAG_NAME.match(tag)
+            if name and name.group(1).lower() in PRESERVED_TAGS and not tag.endswith('/>'):
+                self.preserved = name.group(1).lower()
+
+        if final and pos < len(text):
+            out.append(text[pos:])
+            pos = len(text)
+        self.pending = text[pos:]
+        return ''.join(out)
+
+    def _text(self, text):
+        if not text.strip():
+            return ''
+        return RE_SPACES.sub(' ', text)
+
+
+def minify(content):
+    minifier = HTMLMinifier()
+    return minifier.feed(content) + minifier.close()
+
+
+def minify_stream(chunks, charset):
+    decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+    minifier = HTMLMinifier()
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode(charset)
+        data = minifier.feed(decoder.decode(chunk))
+        if data:
+            yield data.encode(charset)
+    data = minifier.feed(decoder.decode(b'', final=True)) + minifier.close()
+    if data:
+        yield data.encode(charset)
+
+
+# best content encoding the client accepts, brotli only when the brotli package is installed
+def accepted_encoding(request):
+    accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if brotli is not None and RE_BROTLI.search(accept):
+        return 'br'
+    if RE_GZIP.search(accept):
+        return 'gzip'
+    return None
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content)
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+    return compressor.compress(content) + compressor.flush()
+
+
+# a body that is itself cached is compressed once, the compressed copy is cached next to it under
+# the key of the cached body (see blog/cache.py), which changes whenever the body does
+def cached_compress(content, encoding, key):
+    key = 'minify:%s:%s' % (encoding, key)
+    compressed = cache.get(key)
+    if compressed is None:
+        compressed = compress(content, encoding)
+        cache.set(key, compressed, COMPRESS_CACHE_TIMEOUT)
+    return compressed
+
+
+def compress_stream(chunks, encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor()
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
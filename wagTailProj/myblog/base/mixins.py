@@ -0,0 +1,70 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from base import utils
+from base.labels import get_versions, site_labels
+
+
+def page_label(page_id):
+    return 'page:%s' % page_id
+
+
+"""Answers If-None-Match / If-Modified-Since with a 304 before the page is rendered.
+
+The weak ETag is built from the versions of the labels returned by
+get_etag_labels (see base/labels.py), so answering a conditional request
+costs one cache lookup and no query. The labels of the site settings and
+snippets are always included. Returning None from get_etag_labels leaves
+the response alone.
+
+Last-Modified is the later of last_published_at and the last change of a
+header or footer snippet. Pages showing other pages, whose changes don't
+move either date, return None from get_last_modified and only get an ETag.
+"""
+class ConditionalGetMixin(object):
+
+    # bumped by base.signals whenever the page is published, unpublished or deleted
+    def get_cache_labels(self, request, *args, **kwargs):
+        return [page_label(self.pk)]
+
+    def get_etag_labels(self, request, *args, **kwargs):
+        return self.get_cache_labels(request, *args, **kwargs)
+
+    def get_last_modified(self, request, *args, **kwargs):
+        dates = [date for date in (self.last_published_at, utils.get_snippets_updated_at()) if date]
+        return int(max(dates).timestamp()) if dates else None
+
+    def serve(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or getattr(request, 'is_preview', False):
+            return super(ConditionalGetMixin, self).serve(request, *args, **kwargs)
+        user = getattr(request, 'user', None)
+        if user and user.is_authenticated:
+            return super(ConditionalGetMixin, self).serve(request, *args, **kwargs)
+
+        labels = self.get_etag_labels(request, *args, **kwargs)
+        if labels is None:
+            return super(ConditionalGetMixin, self).serve(request, *args, **kwargs)
+
+        site = getattr(request, 'site', None)
+        validators = [
+            request.get_full_path(),
+            site.pk if site else '',
+            utils.get_current_theme(),
+            self.pk,
+            get_versions(list(labels) + site_labels(request)),
+        ]
+        etag = 'W/"%s"' % hashlib.md5(repr(validators).encode()).hexdigest()
+        last_modified = self.get_last_modified(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super(ConditionalGetMixin, self).serve(request, *args, **kwargs)
+            if response.status_code != 200 or response.has_header('ETag'):
+                return response
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
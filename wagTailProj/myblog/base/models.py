@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from wagtail.admin.edit_handlers import (FieldPanel, MultiFieldPanel,
                                          ObjectList,
                                          TabbedInterface)
@@ -15,6 +16,7 @@ from modelcluster.fields import ParentalKey
 from wagtailhyper.fields import HyperField, HyperFieldPanel
 from wagtailhyper.models import WagtailHyperPage
 from wagtail.search import index
+from base.mixins import ConditionalGetMixin
 
 AVIABLE_THEMES = getattr(settings, 'AVIABLE_THEMES', ['default'])
 
@@ -22,7 +24,7 @@ AVIABLE_THEMES = list(map(lambda x: (x, x), AVIABLE_THEMES))
 
 CHANGE_FREQUENCY_CHOICES = [(item, item) for item in ["always", "hourly", "daily", "weekly", "monthly", "yearly", "never"]]
 
-class Page(WagtailHyperPage):
+class Page(ConditionalGetMixin, WagtailHyperPage):
 
     primary_image = models.ForeignKey(
         'wagtailimages.Image',
@@ -121,6 +123,9 @@ class BasicSnippet(models.Model):
 
     content = HyperField()
 
+    # changes the ETag of every page showing this snippet in header or footer
+    updated_at = models.DateTimeField(auto_now=True)
+
     panels = [
         FieldPanel('title'),
         HyperFieldPanel('content')
@@ -214,3 +219,31 @@ class ApplicationSettings(BaseSetting):
         ObjectList(general_settings_panel, heading='General'),
         ObjectList(social_settings_panels, heading='Social & SEO'),
     ])
+
+
+"""Email waiting to be sent, delivered by base/outbox.py"""
+class OutboxMessage(models.Model):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')]
+
+    recipient = models.EmailField()
+    template = models.CharField(max_length=100)
+    data = models.TextField(default='{}')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # a message is picked up once this is in the past, it is moved ahead while a worker holds the message
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='base_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return '%s to %s' % (self.template, self.recipient)
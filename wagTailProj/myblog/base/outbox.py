@@ -0,0 +1,124 @@
+import datetime
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from dit_email_addon.api import DitEmailAddon
+
+from base.models import OutboxMessage
+
+OUTBOX_WORKERS = getattr(settings, 'OUTBOX_WORKERS', 2)
+OUTBOX_BATCH_SIZE = getattr(settings, 'OUTBOX_BATCH_SIZE', 20)
+OUTBOX_MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+# seconds before the first retry, doubled for every further attempt
+OUTBOX_RETRY_DELAY = getattr(settings, 'OUTBOX_RETRY_DELAY', 60)
+# seconds a worker may hold a message before another worker picks it up again
+OUTBOX_LEASE = getattr(settings, 'OUTBOX_LEASE', 60 * 10)
+
+
+def enqueue(messages):
+    OutboxMessage.objects.bulk_create([
+        OutboxMessage(recipient=recipient, template=template, data=json.dumps(data))
+        for recipient, template, data in messages
+    ])
+    transaction.on_commit(kick)
+
+
+# data is the cleaned data of the contact form
+def enqueue_contact_emails(data):
+    contact_email = getattr(settings, 'CONTACT_EMAIL', 'shimul@divine-it.net')
+    enqueue([
+        (contact_email, 'contact', data),
+        (data['email'], 'contact_reply', data),
+    ])
+
+
+def queue_depth():
+    return OutboxMessage.objects.filter(status=OutboxMessage.PENDING).count()
+
+
+def due_messages():
+    return OutboxMessage.objects.filter(
+        status=OutboxMessage.PENDING, next_attempt_at__lte=timezone.now()
+    ).order_by('next_attempt_at')
+
+
+# take up to limit due messages, a message is only taken by the worker that moved its lease forward
+def claim(limit):
+    claimed = []
+    for message in due_messages()[:limit]:
+        lease = timezone.now() + datetime.timedelta(seconds=OUTBOX_LEASE)
+        taken = OutboxMessage.objects.filter(
+            pk=message.pk, status=OutboxMessage.PENDING, next_attempt_at=message.next_attempt_at
+        ).update(next_attempt_at=lease)
+        if taken:
+            claimed.append(message)
+    return claimed
+
+
+def deliver(messages):
+    sent = failed = 0
+    addon = DitEmailAddon()
+    for message in messages:
+        message.attempts += 1
+        try:
+            addon.send_email_default(message.recipient, message.template, json.loads(message.data))
+        except Exception as e:
+            message.last_error = repr(e)
+            if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                message.status = OutboxMessage.FAILED
+                failed += 1
+            else:
+                message.status = OutboxMessage.PENDING
+                message.next_attempt_at = timezone.now() + datetime.timedelta(
+                    seconds=OUTBOX_RETRY_DELAY * 2 ** (message.attempts - 1)
+                )
+        else:
+            message.status = OutboxMessage.SENT
+            message.sent_at = timezone.now()
+            sent += 1
+        message.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
+
+
+# send due messages batch by batch until none are left
+def drain():
+    sent = failed = 0
+    while True:
+        messages = claim(OUTBOX_BATCH_SIZE)
+        if not messages:
+            return sent, failed
+        batch_sent, batch_failed = deliver(messages)
+        sent += batch_sent
+        failed += batch_failed
+
+
+"""
+Small pool draining the outbox in the web process.
+
+kick() never starts more than OUTBOX_WORKERS drains at a time however many
+forms are submitted, everything else waits in the database for a running
+drain, a later kick or the drain_outbox command.
+"""
+_executor = None
+_running = threading.BoundedSemaphore(OUTBOX_WORKERS)
+
+
+def _drain_in_worker():
+    try:
+        drain()
+    finally:
+        connection.close()
+        _running.release()
+
+
+def kick():
+    global _executor
+    if not _running.acquire(blocking=False):
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=OUTBOX_WORKERS)
+    _executor.submit(_drain_in_worker)
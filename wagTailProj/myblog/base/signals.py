@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from wagtail.core.models import Page as WagtailPage
+from django.utils import timezone
+from wagtail.core.signals import page_published, page_unpublished
+
+from base.labels import SNIPPETS_LABEL, invalidate, site_label
+from base.mixins import page_label
+from base.models import ApplicationSettings, BasicSnippet
+from base.sitemaps import invalidate_page
+from base.utils import application_settings_key, set_snippets_updated_at
+
+
+@receiver(page_published)
+@receiver(page_unpublished)
+def page_changed(sender, instance, **kwargs):
+    invalidate_page(instance)
+    invalidate(page_label(instance.pk))
+
+
+# deleting a page of any type deletes its wagtailcore Page row, which sends this signal
+@receiver(post_delete, sender=WagtailPage)
+def page_deleted(sender, instance, **kwargs):
+    invalidate_page(instance)
+    invalidate(page_label(instance.pk))
+
+
+@receiver(post_save, sender=ApplicationSettings)
+@receiver(post_delete, sender=ApplicationSettings)
+def application_settings_changed(sender, instance, **kwargs):
+    cache.delete(application_settings_key(instance.site_id))
+    invalidate(site_label(instance.site_id))
+
+
+@receiver(post_save, sender=BasicSnippet)
+def snippet_saved(sender, instance, **kwargs):
+    set_snippets_updated_at(instance.updated_at)
+    invalidate(SNIPPETS_LABEL)
+
+
+@receiver(post_delete, sender=BasicSnippet)
+def snippet_deleted(sender, instance, **kwargs):
+    set_snippets_updated_at(timezone.now())
+    invalidate(SNIPPETS_LABEL)
+
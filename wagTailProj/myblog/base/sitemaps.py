@@ -0,0 +1,118 @@
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import ExpressionWrapper, F, IntegerField
+from wagtail.core.models import Page as WagtailPage, Site
+
+# the sitemaps protocol allows at most 50000 urls per file
+SITEMAP_MAX_URLS = 50000
+# page ids per shard, a page giving several urls still can't push a shard past SITEMAP_MAX_URLS
+SITEMAP_SHARD_SIZE = min(getattr(settings, 'SITEMAP_SHARD_SIZE', 10000), SITEMAP_MAX_URLS)
+# pages loaded with their specific type at once while rendering a shard
+SITEMAP_CHUNK_SIZE = getattr(settings, 'SITEMAP_CHUNK_SIZE', 500)
+SITEMAP_CACHE_TIMEOUT = getattr(settings, 'SITEMAP_CACHE_TIMEOUT', 60 * 60 * 24)
+
+"""
+Sharded sitemap.
+
+Shard n holds the pages with ids from n * SITEMAP_SHARD_SIZE up to the next
+shard, so a shard never moves when pages are added or removed elsewhere and
+publishing a page only drops the shard holding it. Shards without any page
+are left out of the index. Urls come from the get_sitemap_urls() of every
+page, loaded by chunks with their specific type.
+"""
+
+
+def shards_key(site):
+    return 'sitemap:%s:shards' % site.pk
+
+
+def shard_key(site, shard):
+    return 'sitemap:%s:shard:%s' % (site.pk, shard)
+
+
+def site_pages(site):
+    return WagtailPage.objects.live().public().descendant_of(site.root_page, inclusive=True)
+
+
+# numbers of the shards holding at least one page, with a single grouped query
+def get_shards(site):
+    shards = cache.get(shards_key(site))
+    if shards is None:
+        shards = list(
+            site_pages(site)
+            .annotate(shard=ExpressionWrapper(F('id') / SITEMAP_SHARD_SIZE, output_field=IntegerField()))
+            .order_by('shard').values_list('shard', flat=True).distinct()
+        )
+        cache.set(shards_key(site), shards, SITEMAP_CACHE_TIMEOUT)
+    return shards
+
+
+def shard_pages(site, shard):
+    lower = shard * SITEMAP_SHARD_SIZE
+    pages = site_pages(site).filter(id__gte=lower, id__lt=lower + SITEMAP_SHARD_SIZE).order_by('id')
+    last_id = lower - 1
+    while True:
+        chunk = list(pages.filter(id__gt=last_id).specific()[:SITEMAP_CHUNK_SIZE])
+        for page in chunk:
+            yield page
+        if len(chunk) < SITEMAP_CHUNK_SIZE:
+            return
+        last_id = chunk[-1].pk
+
+
+def shard_urls(site, shard):
+    count = 0
+    for page in shard_pages(site, shard):
+        for url in page.get_sitemap_urls():
+            count += 1
+            if count > SITEMAP_MAX_URLS:
+                return
+            yield url
+
+
+def render_shard(site, shard):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for url in shard_urls(site, shard):
+        parts = ['<url><loc>%s</loc>' % escape(url['location'])]
+        if url.get('lastmod'):
+            parts.append('<lastmod>%s</lastmod>' % url['lastmod'].strftime('%Y-%m-%d'))
+        if url.get('changefreq'):
+            parts.append('<changefreq>%s</changefreq>' % url['changefreq'])
+        if url.get('priority'):
+            parts.append('<priority>%s</priority>' % url['priority'])
+        parts.append('</url>\n')
+        yield ''.join(parts)
+    yield '</urlset>\n'
+
+
+# stream a shard while keeping a copy, the copy is cached once the whole shard was sent
+def cached_shard(site, shard):
+    key = shard_key(site, shard)
+    content = cache.get(key)
+    if content is not None:
+        yield content
+        return
+
+    chunks = []
+    for chunk in render_shard(site, shard):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(chunks), SITEMAP_CACHE_TIMEOUT)
+
+
+def render_index(site, shard_url):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for shard in get_shards(site):
+        yield '<sitemap><loc>%s</loc></sitemap>\n' % escape(shard_url(shard))
+    yield '</sitemapindex>\n'
+
+
+# drop the cached shard holding a page, and the list of shards as the shard may have become empty or new
+def invalidate_page(page):
+    shard = page.pk // SITEMAP_SHARD_SIZE
+    for site in Site.objects.all():
+        cache.delete_many([shard_key(site, shard), shards_key(site)])
@@ -0,0 +1,126 @@
+import datetime
+import json
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from wagtail.core.models import Page, Site
+
+from base import outbox, sitemaps
+from base.middlewares import MinifyHTMLMiddleware
+from base.models import OutboxMessage
+
+
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        outbox.enqueue([('visitor@example.com', 'contact_reply', {'name': 'Visitor'})])
+        self.message = OutboxMessage.objects.get()
+
+    def deliver(self, error=None):
+        with mock.patch('base.outbox.DitEmailAddon') as addon:
+            addon.return_value.send_email_default.side_effect = error
+            return outbox.deliver(outbox.claim(10))
+
+    def test_contact_emails_only_hold_the_given_data(self):
+        outbox.enqueue_contact_emails({'name': 'Visitor', 'email': 'visitor@example.com'})
+        for message in OutboxMessage.objects.filter(template__startswith='contact').exclude(pk=self.message.pk):
+            self.assertEqual(json.loads(message.data), {'name': 'Visitor', 'email': 'visitor@example.com'})
+
+    def test_failed_send_is_retried_later(self):
+        before = timezone.now()
+        self.assertEqual(self.deliver(IOError('down')), (0, 0))
+
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, OutboxMessage.PENDING)
+        self.assertEqual(self.message.attempts, 1)
+        self.assertIn('down', self.message.last_error)
+        self.assertGreaterEqual(
+            self.message.next_attempt_at, before + datetime.timedelta(seconds=outbox.OUTBOX_RETRY_DELAY)
+        )
+        # not due yet
+        self.assertEqual(outbox.claim(10), [])
+
+    def test_retry_delay_doubles_and_gives_up(self):
+        for attempt in range(1, outbox.OUTBOX_MAX_ATTEMPTS + 1):
+            OutboxMessage.objects.filter(pk=self.message.pk).update(next_attempt_at=timezone.now())
+            before = timezone.now()
+            self.deliver(IOError('down'))
+            self.message.refresh_from_db()
+            self.assertEqual(self.message.attempts, attempt)
+            if attempt < outbox.OUTBOX_MAX_ATTEMPTS:
+                delay = outbox.OUTBOX_RETRY_DELAY * 2 ** (attempt - 1)
+                self.assertGreaterEqual(self.message.next_attempt_at, before + datetime.timedelta(seconds=delay))
+        self.assertEqual(self.message.status, OutboxMessage.FAILED)
+
+    def test_retry_succeeds(self):
+        self.deliver(IOError('down'))
+        OutboxMessage.objects.filter(pk=self.message.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(self.deliver(), (1, 0))
+
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, OutboxMessage.SENT)
+        self.assertEqual(self.message.attempts, 2)
+
+    def test_claimed_message_is_not_claimed_again(self):
+        self.assertEqual(len(outbox.claim(10)), 1)
+        self.assertEqual(outbox.claim(10), [])
+
+
+@mock.patch('base.sitemaps.SITEMAP_SHARD_SIZE', 2)
+@mock.patch('base.sitemaps.SITEMAP_CHUNK_SIZE', 1)
+class SitemapTests(TestCase):
+
+    def setUp(self):
+        self.site = Site.objects.get(is_default_site=True)
+        for number in range(5):
+            self.site.root_page.add_child(instance=Page(title='Page %d' % number, slug='page-%d' % number))
+
+    def test_shards_are_id_ranges_holding_pages(self):
+        ids = sitemaps.site_pages(self.site).values_list('id', flat=True)
+        self.assertEqual(sitemaps.get_shards(self.site), sorted(set(pk // 2 for pk in ids)))
+
+    def test_shard_lists_the_urls_of_its_pages(self):
+        for shard in sitemaps.get_shards(self.site):
+            pages = sitemaps.site_pages(self.site).filter(id__gte=shard * 2, id__lt=shard * 2 + 2)
+            locations = [url['location'] for url in sitemaps.shard_urls(self.site, shard)]
+            self.assertEqual(locations, [page.full_url for page in pages.order_by('id')])
+
+    def test_deleting_a_page_drops_its_shard(self):
+        page = Page.objects.get(slug='page-4')
+        shard, url = page.pk // 2, page.full_url
+        self.assertIn(url, ''.join(sitemaps.cached_shard(self.site, shard)))
+
+        page.delete()
+
+        self.assertNotIn(url, ''.join(sitemaps.cached_shard(self.site, shard)))
+
+
+@mock.patch('base.middlewares.COMPRESS_HTML', True)
+class MinifyHTMLMiddlewareTests(TestCase):
+
+    html = '<div>\n    <p>  text  </p>\n</div>\n' * 20
+
+    def respond(self, response, **headers):
+        return MinifyHTMLMiddleware(lambda request: response)(RequestFactory().get('/', **headers))
+
+    def test_html_is_minified(self):
+        response = self.respond(HttpResponse(self.html))
+        self.assertEqual(response.content, b'<div><p> text </p></div>' * 20)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+
+    def test_cached_responses_are_not_minified_again(self):
+        response = HttpResponse(self.html)
+        response.minified = True
+        self.assertEqual(self.respond(response).content, self.html.encode())
+
+    def test_cached_responses_are_compressed_once(self):
+        with mock.patch('base.minify.compress', return_value=b'compressed') as compress:
+            for _ in range(2):
+                response = HttpResponse(self.html)
+                response.cache_key = 'blog:response:key'
+                response = self.respond(response, HTTP_ACCEPT_ENCODING='gzip')
+                self.assertEqual(response.content, b'compressed')
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(compress.call_count, 1)
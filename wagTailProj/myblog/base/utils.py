@@ -1,6 +1,83 @@
+import threading
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # python < 3.7
+    ContextVar = None
+
+DEFAULT_THEME = 'default'
+
+APPLICATION_SETTINGS_TIMEOUT = getattr(settings, 'APPLICATION_SETTINGS_TIMEOUT', 60 * 60)
+SNIPPETS_UPDATED_KEY = 'base:snippets_updated_at'
+
+"""
+Theme of the request being handled.
+
+Kept in a context variable (a thread local on python < 3.7) instead of a
+module global, so concurrent requests for different sites in threaded or
+async workers each render with their own theme.
+"""
+if ContextVar is not None:
+    _current_theme = ContextVar('current_theme', default=DEFAULT_THEME)
+
+    def get_current_theme():
+        return _current_theme.get()
+
+    def set_current_theme(theme):
+        return _current_theme.set(theme)
+
+    def reset_current_theme(token):
+        _current_theme.reset(token)
+else:
+    _local = threading.local()
+
+    def get_current_theme():
+        return getattr(_local, 'theme', DEFAULT_THEME)
+
+    def set_current_theme(theme):
+        token = get_current_theme()
+        _local.theme = theme
+        return token
+
+    def reset_current_theme(token):
+        _local.theme = token
+
+
+def application_settings_key(site_id):
+    return 'base:application_settings:%s' % site_id
+
+
+# ApplicationSettings of a site from the cache, the entry is dropped when the settings are saved
+def get_application_settings(site):
+    from base.models import ApplicationSettings
+
+    key = application_settings_key(site.pk)
+    app_settings = cache.get(key)
+    if app_settings is None:
+        app_settings = ApplicationSettings.for_site(site)
+        cache.set(key, app_settings, APPLICATION_SETTINGS_TIMEOUT)
+    return app_settings
+
+
+# When a header or footer snippet last changed, from BasicSnippet.updated_at. base.signals keeps it
+# in the shared cache, so only the first call after the cache was emptied runs a query
+def get_snippets_updated_at():
+    cached = cache.get(SNIPPETS_UPDATED_KEY)
+    if cached is None:
+        from base.models import BasicSnippet
+
+        cached = [BasicSnippet.objects.aggregate(updated_at=Max('updated_at'))['updated_at']]
+        cache.set(SNIPPETS_UPDATED_KEY, cached, None)
+    return cached[0]
+
+
+def set_snippets_updated_at(updated_at):
+    cache.set(SNIPPETS_UPDATED_KEY, [updated_at], None)
 
-CURRENT_THEME = 'default'
 
 def template_tag_load_string():
     return "{% load "+ " ".join(settings.TEMPLATE_TAGS_FOR_TEXTAREAS) +" %}"
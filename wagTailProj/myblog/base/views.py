@@ -0,0 +1,24 @@
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+
+from base.sitemaps import cached_shard, get_shards, render_index
+
+
+def sitemap_index(request):
+    site = request.site
+    if site is None:
+        raise Http404
+
+    def shard_url(shard):
+        return request.build_absolute_uri(reverse('sitemap_shard', args=(shard + 1,)))
+
+    return StreamingHttpResponse(render_index(site, shard_url), content_type='application/xml')
+
+
+def sitemap_shard(request, shard):
+    site = request.site
+    shard = int(shard) - 1
+    if site is None or shard not in get_shards(site):
+        raise Http404
+
+    return StreamingHttpResponse(cached_shard(site, shard), content_type='application/xml')
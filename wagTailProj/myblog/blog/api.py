@@ -0,0 +1,114 @@
+import hashlib
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from wagtail.core.rich_text import expand_db_html
+
+from blog.models import PostPage
+from blog.pagination import KeysetPaginator
+from blog.permalinks import get_permalinks
+
+BLOG_API_PAGE_SIZE = getattr(settings, 'BLOG_API_PAGE_SIZE', 20)
+BLOG_API_MAX_PAGE_SIZE = getattr(settings, 'BLOG_API_MAX_PAGE_SIZE', 100)
+
+# fields a client can ask for with ?fields=, url is built from date and slug and body is sent as HTML
+API_FIELDS = ('id', 'title', 'slug', 'date', 'url', 'search_description', 'last_published_at', 'body')
+DEFAULT_FIELDS = ('id', 'title', 'date', 'url')
+
+
+class ApiError(Exception):
+    pass
+
+
+def get_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return DEFAULT_FIELDS
+    fields = tuple(field.strip() for field in fields.split(',') if field.strip())
+    unknown = [field for field in fields if field not in API_FIELDS]
+    if unknown:
+        raise ApiError('Unknown fields: %s' % ', '.join(unknown))
+    return fields
+
+
+def get_date(request, name):
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        value = parse_date(value)
+    except ValueError:
+        value = None
+    if value is None:
+        raise ApiError('%s must be a date in YYYY-MM-DD format' % name)
+    return value
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', BLOG_API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit must be a number')
+    return max(1, min(limit, BLOG_API_MAX_PAGE_SIZE))
+
+
+# live posts of a blog filtered by tag, category and date range from the query string
+def api_posts(request, blog_page):
+    posts = PostPage.objects.live().filter(archive_entry__blog=blog_page)
+    if request.GET.get('tag'):
+        posts = posts.filter(tags__slug=request.GET['tag'])
+    if request.GET.get('category'):
+        posts = posts.filter(categories__slug=request.GET['category'])
+
+    date_from = get_date(request, 'date_from')
+    date_to = get_date(request, 'date_to')
+    if date_from:
+        posts = posts.filter(archive_entry__posted_at__date__gte=date_from)
+    if date_to:
+        posts = posts.filter(archive_entry__posted_at__date__lte=date_to)
+    return posts
+
+
+"""
+Read-only JSON listing of the posts of a blog.
+
+Rows come from values() with only the requested columns (plus id and date
+for the keyset cursor), no PostPage instance is created. The ETag is a hash
+of the payload so clients and caches can revalidate with If-None-Match.
+"""
+def serve_posts_api(request, blog_page):
+    try:
+        fields = get_fields(request)
+        posts = api_posts(request, blog_page)
+        limit = get_limit(request)
+    except ApiError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    columns = {'id', 'date'}
+    columns.update(field for field in fields if field != 'url')
+    if 'url' in fields:
+        columns.add('slug')
+
+    page = KeysetPaginator(posts.values(*columns), per_page=limit).page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+    permalinks = get_permalinks(blog_page, request, absolute=True) if 'url' in fields else None
+    results = []
+    for row in page:
+        if permalinks:
+            row['url'] = permalinks.url_for(row['date'], row['slug'])
+        if 'body' in fields:
+            row['body'] = expand_db_html(row['body'])
+        results.append({field: row[field] for field in fields})
+
+    response = JsonResponse({
+        'results': results,
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+    response['ETag'] = '"%s"' % hashlib.sha1(response.content).hexdigest()
+    return get_conditional_response(request, etag=response['ETag'], response=response)
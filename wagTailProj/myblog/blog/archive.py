@@ -0,0 +1,47 @@
+from blog.dates import post_local_date
+from blog.models import PostArchiveEntry, PostPage
+
+
+# (blog id, slug) a post is currently listed under according to the archive
+def indexed_locations(post):
+    return set(PostArchiveEntry.objects.filter(post_id=post.pk).values_list('blog_id', 'slug'))
+
+
+# add or refresh the archive row of a post, a post that is not live is removed from the archive.
+# returns the (blog id, slug) pairs the post was and is listed under
+def index_post(post):
+    if not post.live:
+        return unindex_post(post)
+
+    locations = indexed_locations(post)
+    blog_id = post.get_parent().pk
+    post_date = post_local_date(post.date)
+    PostArchiveEntry.objects.update_or_create(
+        post_id=post.pk,
+        defaults={
+            'blog_id': blog_id,
+            'slug': post.slug,
+            'posted_at': post.date,
+            'year': post_date.year,
+            'month': post_date.month,
+            'day': post_date.day,
+        }
+    )
+    locations.add((blog_id, post.slug))
+    return locations
+
+
+def unindex_post(post):
+    locations = indexed_locations(post)
+    PostArchiveEntry.objects.filter(post_id=post.pk).delete()
+    return locations
+
+
+# rebuild the whole archive from the page tree, used by the rebuild_post_archive command
+def rebuild_archive():
+    PostArchiveEntry.objects.all().delete()
+    count = 0
+    for post in PostPage.objects.live().iterator():
+        index_post(post)
+        count += 1
+    return count
@@ -0,0 +1,148 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from base import utils
+from base.labels import get_versions, invalidate, site_labels
+from base.minify import COMPRESS_HTML, minify
+
+BLOG_CACHE = getattr(settings, 'BLOG_RESPONSE_CACHE', 'default')
+BLOG_CACHE_TIMEOUT = getattr(settings, 'BLOG_RESPONSE_CACHE_TIMEOUT', 60 * 60)
+
+# response headers kept with a cached body
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+"""
+Full response cache for blog pages.
+
+Responses are keyed on the versions of the labels they depend on (see
+base/labels.py), so bumping a label drops exactly the responses showing it.
+HTML is stored minified when COMPRESS_HTML is set, and responses carry
+their key, so MinifyHTMLMiddleware neither minifies a cached body again nor
+compresses it more than once per encoding.
+"""
+
+
+def get_cache():
+    return caches[BLOG_CACHE]
+
+
+def blog_label(blog_id):
+    return 'blog:%s' % blog_id
+
+
+# the blog page itself (title, description, url) as shown on its posts, keyed on its tree path
+# so a post can name it without loading it
+def blog_page_label(path):
+    return 'blog-page:%s' % path
+
+
+def post_label(slug):
+    return 'post:%s' % slug
+
+
+def tag_label(slug):
+    return 'tag:%s' % slug
+
+
+def category_label(slug):
+    return 'category:%s' % slug
+
+
+# drop everything a post is shown on: listings of the blogs it was or is in and its permalinks,
+# locations are the (blog id, slug) pairs returned by blog.archive
+def invalidate_post(post, locations):
+    labels = {post_label(post.slug)}
+    for blog_id, slug in locations:
+        labels.update([blog_label(blog_id), post_label(slug)])
+    invalidate(*labels)
+
+
+def is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if getattr(request, 'is_preview', False):
+        return False
+    user = getattr(request, 'user', None)
+    return not (user and user.is_authenticated)
+
+
+def is_html(response):
+    return 'text/html' in response.get('Content-Type', '')
+
+
+def is_cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not response.has_header('Content-Encoding')
+    )
+
+
+def response_key(request, page, route, labels):
+    parts = [
+        request.site.pk if getattr(request, 'site', None) else '',
+        utils.get_current_theme(),
+        page.pk,
+        route,
+        sorted(request.GET.lists()),
+        get_versions(list(labels) + site_labels(request)),
+    ]
+    return 'blog:response:%s' % hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+"""Caches the rendered response of serve() for anonymous visitors.
+
+Pages set which labels a response depends on with get_cache_labels and
+describe the route being served with get_cache_route. The settings and
+snippets of the site are always part of the key.
+"""
+class ResponseCacheMixin(object):
+
+    def get_cache_route(self, *args, **kwargs):
+        return ('serve', args, sorted(kwargs.items()))
+
+    def get_cache_labels(self, request, *args, **kwargs):
+        return []
+
+    def serve(self, request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return super(ResponseCacheMixin, self).serve(request, *args, **kwargs)
+
+        key = response_key(
+            request, self,
+            self.get_cache_route(*args, **kwargs),
+            self.get_cache_labels(request, *args, **kwargs),
+        )
+        cache = get_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type, headers, minified = cached
+            response = HttpResponse(content, content_type=content_type)
+            for header, value in headers:
+                response[header] = value
+            response.minified = minified
+            response.cache_key = key
+            return get_conditional_response(request, etag=response.get('ETag'), response=response)
+
+        response = super(ResponseCacheMixin, self).serve(request, *args, **kwargs)
+
+        def store(response):
+            if not is_cacheable_response(response):
+                return
+            response.minified = COMPRESS_HTML and is_html(response)
+            if response.minified:
+                response.content = minify(response.content.decode(response.charset)).encode(response.charset)
+            response.cache_key = key
+            headers = [(header, response[header]) for header in CACHED_HEADERS if response.has_header(header)]
+            cache.set(key, (response.content, response['Content-Type'], headers, response.minified), BLOG_CACHE_TIMEOUT)
+
+        if hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
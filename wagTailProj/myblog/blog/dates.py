@@ -0,0 +1,9 @@
+from django.utils import timezone
+
+
+# date of a post as it is shown on the site, aware datetimes are converted to the current timezone.
+# Migration 0007 has a copy of it
+def post_local_date(value):
+    if timezone.is_aware(value):
+        return timezone.localtime(value).date()
+    return value.date()
@@ -0,0 +1,110 @@
+import hashlib
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+from django.utils.http import http_date
+
+from blog.models import PostPage
+from blog.permalinks import get_permalinks
+
+BLOG_FEED_SIZE = getattr(settings, 'BLOG_FEED_SIZE', 20)
+
+FEED_FIELDS = ('id', 'title', 'slug', 'date', 'last_published_at', 'search_description')
+
+
+# live posts of a blog for a feed, only the columns the feed prints are loaded
+def feed_posts(blog_page, tag=None, category=None):
+    posts = PostPage.objects.live().filter(archive_entry__blog=blog_page)
+    if tag:
+        posts = posts.filter(tags__slug=tag)
+    if category:
+        posts = posts.filter(categories__slug=category)
+    return posts
+
+
+def rss_feed(blog_page, posts, permalinks, feed_url, updated):
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"><channel>'
+    yield '<title>%s</title>' % escape(blog_page.title)
+    yield '<link>%s</link>' % escape(permalinks.base_url or '')
+    yield '<description>%s</description>' % escape(blog_page.description)
+    yield '<atom:link href=%s rel="self"></atom:link>' % quoteattr(feed_url)
+    if updated:
+        yield '<lastBuildDate>%s</lastBuildDate>' % rfc2822_date(updated)
+    for post in posts:
+        url = escape(permalinks.url(post) or '')
+        yield '<item><title>%s</title><link>%s</link><guid>%s</guid><pubDate>%s</pubDate>' % (
+            escape(post.title), url, url, rfc2822_date(post.date)
+        )
+        yield '<description>%s</description></item>' % escape(post.search_description)
+    yield '</channel></rss>\n'
+
+
+def atom_feed(blog_page, posts, permalinks, feed_url, updated):
+    yield '<?xml version="1.0" encoding="utf-8"?>\n'
+    yield '<feed xmlns="http://www.w3.org/2005/Atom">'
+    yield '<title>%s</title>' % escape(blog_page.title)
+    yield '<link href=%s rel="alternate"></link>' % quoteattr(permalinks.base_url or '')
+    yield '<link href=%s rel="self"></link>' % quoteattr(feed_url)
+    yield '<id>%s</id>' % escape(feed_url)
+    if updated:
+        yield '<updated>%s</updated>' % rfc3339_date(updated)
+    yield '<subtitle>%s</subtitle>' % escape(blog_page.description)
+    for post in posts:
+        url = permalinks.url(post) or ''
+        yield '<entry><title>%s</title><link href=%s rel="alternate"></link><id>%s</id>' % (
+            escape(post.title), quoteattr(url), escape(url)
+        )
+        yield '<published>%s</published><updated>%s</updated>' % (
+            rfc3339_date(post.date), rfc3339_date(post.last_published_at or post.date)
+        )
+        yield '<summary>%s</summary></entry>' % escape(post.search_description)
+    yield '</feed>\n'
+
+
+FEEDS = {
+    'rss': (rss_feed, 'application/rss+xml; charset=utf-8'),
+    'atom': (atom_feed, 'application/atom+xml; charset=utf-8'),
+}
+
+
+"""
+Streams an RSS or Atom feed of a blog, optionally narrowed to a tag or category.
+
+Validators come from one aggregate query (latest last_published_at and number
+of posts), so a poll with a matching ETag or If-Modified-Since gets a 304
+before any post is loaded.
+"""
+def serve_feed(request, blog_page, feed_type, tag=None, category=None):
+    posts = feed_posts(blog_page, tag=tag, category=category)
+    stats = posts.aggregate(updated=Max('last_published_at'), count=Count('pk'))
+    updated = stats['updated']
+
+    etag = '"%s"' % hashlib.md5(
+        repr((blog_page.pk, blog_page.title, feed_type, tag, category, updated, stats['count'])).encode()
+    ).hexdigest()
+    last_modified = int(updated.timestamp()) if updated else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        generator, content_type = FEEDS[feed_type]
+        posts = posts.only(*FEED_FIELDS).order_by('-date', '-pk')[:BLOG_FEED_SIZE]
+        response = StreamingHttpResponse(
+            generator(
+                blog_page,
+                posts.iterator(),
+                get_permalinks(blog_page, request, absolute=True),
+                request.build_absolute_uri(),
+                updated,
+            ),
+            content_type=content_type,
+        )
+
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.archive import rebuild_archive
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the date archive index of live blog posts'
+
+    def handle(self, *args, **options):
+        count = rebuild_archive()
+        self.stdout.write('Indexed %d posts' % count)
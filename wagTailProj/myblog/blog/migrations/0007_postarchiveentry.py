@@ -0,0 +1,62 @@
+# Generated by Django 2.0.9 on 2018-10-18 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+# blog.dates.post_local_date as it was when this migration was written, copied so later
+# changes to blog.dates don't change what this migration does
+def post_local_date(value):
+    if timezone.is_aware(value):
+        return timezone.localtime(value).date()
+    return value.date()
+
+
+def populate_archive(apps, schema_editor):
+    PostPage = apps.get_model('blog', 'PostPage')
+    Page = apps.get_model('wagtailcore', 'Page')
+    PostArchiveEntry = apps.get_model('blog', 'PostArchiveEntry')
+
+    for post in PostPage.objects.filter(live=True).iterator():
+        parent = Page.objects.filter(path=post.path[:-4]).first()
+        if parent is None:
+            continue
+        # same date as blog.archive.index_post gives the post
+        post_date = post_local_date(post.date)
+        PostArchiveEntry.objects.create(
+            blog_id=parent.pk,
+            post_id=post.pk,
+            posted_at=post.date,
+            year=post_date.year,
+            month=post_date.month,
+            day=post_date.day,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0040_page_draft_title'),
+        ('blog', '0006_svgimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostArchiveEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posted_at', models.DateTimeField()),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('day', models.PositiveSmallIntegerField()),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.Page')),
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive_entry', to='blog.PostPage')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postarchiveentry',
+            index=models.Index(fields=['blog', 'year', 'month', 'day', 'posted_at'], name='blog_archive_date_idx'),
+        ),
+        migrations.RunPython(populate_archive, migrations.RunPython.noop),
+    ]
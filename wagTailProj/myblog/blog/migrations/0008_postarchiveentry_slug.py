@@ -0,0 +1,32 @@
+# Generated by Django 2.0.9 on 2018-10-18 11:40
+
+from django.db import migrations, models
+
+
+def populate_slug(apps, schema_editor):
+    PostArchiveEntry = apps.get_model('blog', 'PostArchiveEntry')
+
+    for entry in PostArchiveEntry.objects.select_related('post').iterator():
+        entry.slug = entry.post.slug
+        entry.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_postarchiveentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postarchiveentry',
+            name='slug',
+            field=models.SlugField(allow_unicode=True, default='', max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_slug, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='postarchiveentry',
+            index=models.Index(fields=['blog', 'year', 'month', 'day', 'slug'], name='blog_archive_slug_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.0.9 on 2018-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_postarchiveentry_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='svgimage',
+            name='optimized',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.0.9 on 2018-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_svgimage_optimized'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postpage',
+            index=models.Index(fields=['-date', '-page_ptr'], name='blog_post_date_idx'),
+        ),
+    ]
@@ -0,0 +1,148 @@
+# Generated by Django 2.0.9 on 2018-10-22 10:05
+
+import re
+import xml.etree.ElementTree as et
+from xml.parsers import expat
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations
+
+# The sanitiser of blog/svg.py as it was when this migration was written, copied so later
+# changes to blog.svg don't change what this migration does
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+
+ALLOWED_TAGS = {
+    'svg', 'g', 'defs', 'symbol', 'use', 'title', 'desc',
+    'path', 'rect', 'circle', 'ellipse', 'line', 'polyline', 'polygon',
+    'text', 'tspan', 'textPath',
+    'linearGradient', 'radialGradient', 'stop', 'clipPath', 'mask', 'pattern', 'marker',
+    'filter', 'feBlend', 'feColorMatrix', 'feComposite', 'feFlood', 'feGaussianBlur',
+    'feMerge', 'feMergeNode', 'feOffset',
+}
+ALLOWED_ATTRIBUTES = {
+    'id', 'class', 'viewBox', 'preserveAspectRatio', 'width', 'height', 'transform',
+    'x', 'y', 'x1', 'x2', 'y1', 'y2', 'cx', 'cy', 'r', 'rx', 'ry', 'fx', 'fy', 'd', 'points',
+    'fill', 'fill-opacity', 'fill-rule', 'stroke', 'stroke-width', 'stroke-linecap', 'stroke-linejoin',
+    'stroke-miterlimit', 'stroke-dasharray', 'stroke-dashoffset', 'stroke-opacity',
+    'opacity', 'color', 'display', 'visibility', 'clip-path', 'clip-rule', 'mask', 'filter',
+    'offset', 'stop-color', 'stop-opacity', 'gradientUnits', 'gradientTransform', 'spreadMethod',
+    'patternUnits', 'patternContentUnits', 'patternTransform', 'clipPathUnits', 'maskUnits',
+    'maskContentUnits', 'markerWidth', 'markerHeight', 'markerUnits', 'refX', 'refY', 'orient',
+    'marker-start', 'marker-mid', 'marker-end', 'filterUnits', 'primitiveUnits',
+    'in', 'in2', 'result', 'stdDeviation', 'mode', 'type', 'values', 'operator', 'k1', 'k2', 'k3', 'k4',
+    'dx', 'dy', 'flood-color', 'flood-opacity',
+    'font-family', 'font-size', 'font-weight', 'font-style', 'text-anchor', 'dominant-baseline',
+    'letter-spacing', 'rotate', 'textLength', 'lengthAdjust', 'startOffset',
+    'href', 'role', 'aria-label', 'aria-hidden',
+}
+# url(#id) pointing inside the document is the only url() an attribute may hold
+LOCAL_URL_RE = re.compile(r'url\(["\']?#[-\w.:]+["\']?\)')
+# whitespace and control characters browsers skip inside a scheme like "java\tscript:"
+IGNORED_CHARACTERS_RE = re.compile(r'[\x00-\x20]+')
+
+et.register_namespace('', SVG_NS)
+et.register_namespace('xlink', XLINK_NS)
+
+
+def local_name(name):
+    return name.rsplit('}', 1)[-1]
+
+
+def namespace(name):
+    return name[1:].split('}', 1)[0] if name.startswith('{') else ''
+
+
+# refuse DOCTYPE and entity declarations, entities are never expanded and
+# can't pull in external documents. Raises ValueError
+def check_declarations(data):
+    def refuse(*args):
+        raise ValueError('SVG files with a DOCTYPE or entities are not accepted')
+
+    parser = expat.ParserCreate()
+    parser.StartDoctypeDeclHandler = refuse
+    parser.EntityDeclHandler = refuse
+    try:
+        parser.Parse(data, True)
+    except expat.ExpatError:
+        raise ValueError('Not an SVG document')
+
+
+def parse(data):
+    check_declarations(data)
+    root = et.fromstring(data)
+    if root.tag != '{%s}svg' % SVG_NS:
+        raise ValueError('Not an SVG document')
+    return root
+
+
+def is_safe_value(attribute, value):
+    compact = IGNORED_CHARACTERS_RE.sub('', value).lower()
+    if attribute == 'href':
+        return compact.startswith('#')
+    if 'javascript:' in compact:
+        return False
+    return compact.count('url(') == len(LOCAL_URL_RE.findall(compact))
+
+
+# Keep only ALLOWED_TAGS and ALLOWED_ATTRIBUTES, links pointing inside the
+# document and url() values referencing an id. Comments are already dropped by the parser
+def sanitize(element):
+    for child in list(element):
+        if namespace(child.tag) != SVG_NS or local_name(child.tag) not in ALLOWED_TAGS:
+            element.remove(child)
+        else:
+            sanitize(child)
+
+    for name in list(element.attrib):
+        ns, attribute = namespace(name), local_name(name)
+        if (
+            ns not in ('', XLINK_NS)
+            or (ns == XLINK_NS and attribute != 'href')
+            or attribute not in ALLOWED_ATTRIBUTES
+            or not is_safe_value(attribute, element.attrib[name])
+        ):
+            del element.attrib[name]
+    return element
+
+
+# the sanitised document, what is stored for an upload
+def clean_svg(data):
+    return et.tostring(sanitize(parse(data)), encoding='utf-8')
+
+
+# Uploads used to be stored as they came, rewrite them sanitised like SvgImage.save does now.
+# Files that can't be made safe (a DOCTYPE, entities, not SVG at all) are removed. The
+# optimized copies were made by the old sanitiser and are dropped, blog.svg rebuilds them
+def sanitize_uploads(apps, schema_editor):
+    SvgImage = apps.get_model('blog', 'SvgImage')
+
+    for svg_image in SvgImage.objects.all().iterator():
+        if svg_image.optimized:
+            default_storage.delete(svg_image.optimized.name)
+        svg_image.optimized = ''
+
+        if svg_image.image:
+            name = svg_image.image.name
+            try:
+                with default_storage.open(name, 'rb') as f:
+                    data = clean_svg(f.read())
+            except (ValueError, et.ParseError, IOError):
+                data = None
+            default_storage.delete(name)
+            svg_image.image = default_storage.save(name, ContentFile(data)) if data is not None else ''
+
+        svg_image.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_postpage_date_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(sanitize_uploads, migrations.RunPython.noop),
+    ]
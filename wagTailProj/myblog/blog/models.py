@@ -1,8 +1,10 @@
 import datetime
 from datetime import date
 from django.db import models
+from django.db.models import Count
 from django.http import Http404, HttpResponse
-from wagtail.core.models import Page
+from wagtail.core.models import Page, PageManager
+from wagtail.core.query import PageQuerySet
 from wagtail.core.fields import RichTextField
 from wagtail.admin.edit_handlers import FieldPanel
 
@@ -21,57 +23,122 @@ from wagtailmarkdown.fields import MarkdownField
 from wagtailmarkdown.edit_handlers import MarkdownPanel
 from django.utils.formats import date_format
 from django.utils.dateformat import DateFormat
+from blog.pagination import KeysetPaginator
+from base.mixins import ConditionalGetMixin
+from blog.cache import ResponseCacheMixin, blog_label, blog_page_label, post_label, tag_label, category_label
+from blog.svg import clean_svg, parse, sprite_url, symbol_id
 
 # New import for image 
 from django.utils.html import format_html
 from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
 import xml.etree.cElementTree as et
 
 
 """Class using for generating blog"""
-class BlogPage(RoutablePageMixin, Page):
+class BlogPage(ConditionalGetMixin, ResponseCacheMixin, RoutablePageMixin, Page):
     description = models.CharField(max_length=250, blank=True)
 
     content_panels = Page.content_panels + [
         FieldPanel('description', classname='full')
     ]
 
+    # RoutablePageMixin.serve gets the matched view with its arguments
+    def get_cache_route(self, view=None, args=None, kwargs=None):
+        name = view.__name__ if view else 'serve'
+        return (name, list(args or []), sorted((kwargs or {}).items()))
+
+    # feeds and the api set their own validators
+    def get_etag_labels(self, request, view=None, args=None, kwargs=None):
+        if view and view.__name__ in ('feed', 'posts_api'):
+            return None
+        return self.get_cache_labels(request, view, args, kwargs)
+
+    # listings and permalinks show posts, which change without moving the dates of this page
+    def get_last_modified(self, request, *args, **kwargs):
+        return None
+
+    # a permalink depends on its post and on this page, every listing also shows the archive of the whole blog
+    def get_cache_labels(self, request, view=None, args=None, kwargs=None):
+        name = view.__name__ if view else 'serve'
+        args = args or []
+        kwargs = kwargs or {}
+        if name == 'post_by_date_slug':
+            return [post_label(args[3]), blog_page_label(self.path)]
+        labels = [blog_label(self.pk)]
+        if name == 'posts_api':
+            # the api filters on the query string instead of the route
+            kwargs = request.GET
+        if kwargs.get('tag'):
+            labels.append(tag_label(kwargs['tag']))
+        if kwargs.get('category'):
+            labels.append(category_label(kwargs['category']))
+        return labels
+
     def get_context(self, request, *args, **kwargs):
         context = super(BlogPage, self).get_context(request, *args, **kwargs)
-        context['posts'] = self.posts
+        posts = KeysetPaginator(self.posts.with_blog_page(self)).page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+        context['posts'] = posts
+        context['next_cursor'] = posts.next_cursor
+        context['previous_cursor'] = posts.previous_cursor
         context['blog_page'] = self
+        context['archive'] = self.get_archive()
         return context
 
     def get_posts(self):
         return PostPage.objects.descendant_of(self).live()
 
+    # archive of live posts kept in PostArchiveEntry (see blog/archive.py), it returns
+    # one row per month with number of posts, newest month first
+    def get_archive(self):
+        return PostArchiveEntry.objects.filter(blog=self).values('year', 'month').annotate(
+            count=Count('post')
+        ).order_by('-year', '-month')
+
+    # date routes read post ids from the archive index instead of scanning the page tree by date
     @route(r'^(\d{4})/$')
     @route(r'^(\d{4})/(\d{2})/$')
     @route(r'^(\d{4})/(\d{2})/(\d{2})/$')
     def post_by_date(self, request, year, month=None, day=None, *args, **kwargs):
-        self.posts = self.get_posts().filter(date__year=year)
+        entries = {'archive_entry__blog': self, 'archive_entry__year': int(year)}
         self.search_type = 'date'
         self.search_term = year
 
         if month:
-            self.posts = self.posts.filter(date__month=month)
+            entries['archive_entry__month'] = int(month)
             df = DateFormat(date(int(year), int(month), 1))
             self.search_term = df.format('F Y')
         
         if day:
-            self.posts = self.posts.filter(date__day=day)
+            entries['archive_entry__day'] = int(day)
             df = DateFormat(date(int(year), int(month), int(day)))
+
+        self.posts = PostPage.objects.live().filter(**entries)
         
         return Page.serve(self, request, *args, **kwargs)
 
-    # in post_by_date_slug we first get the slug from the URL, then find the post which have the slug, 
-    # if not found, we return 404 HTTP error, if found, we call Page.serve to render the post, the first parameters passed 
-    # in is the post object instead of blog page object itself, post_page.serve(request, *args, **kwargs) 
-    # should also work here too
+    # in post_by_date_slug we look the post up in the archive index by (blog, date, slug), a single
+    # indexed query. if not found or the date is not a real date, we return 404 HTTP error, if found,
+    # we call Page.serve to render the post, the first parameters passed in is the post object
+    # instead of blog page object itself
 
     @route(r'^(\d{4})/(\d{2})/(\d{2})/(.+)/$')
     def post_by_date_slug(self, request, year, month, day, slug, *args, **kwargs):
-        post_page = self.get_posts().filter(slug=slug).first()
+        try:
+            post_date = date(int(year), int(month), int(day))
+        except ValueError:
+            raise Http404
+
+        post_page = PostPage.objects.live().with_blog_page(self).filter(
+            archive_entry__blog=self,
+            archive_entry__year=post_date.year,
+            archive_entry__month=post_date.month,
+            archive_entry__day=post_date.day,
+            archive_entry__slug=slug,
+        ).first()
 
         if not post_page:
             raise Http404
@@ -84,20 +151,72 @@ class BlogPage(RoutablePageMixin, Page):
         self.posts       = self.get_posts().filter(tags__slug=tag)
         return Page.serve(self, request, *args, **kwargs)
 
-    @route(r'^tag/(?P<tag>[-\w]+)/$')
+    @route(r'^category/(?P<category>[-\w]+)/$')
     def post_by_category(self, request, category, *args, **kwargs):
         self.search_type = 'category'
-        self.search_type = category
+        self.search_term = category
         self.posts       = self.get_posts().filter(categories__slug=category)
         return Page.serve(self, request, *args, **kwargs)
     
+    # feeds of the whole blog, a tag or a category, see blog/feeds.py
+    @route(r'^feed/(?P<feed_type>rss|atom)/$')
+    @route(r'^tag/(?P<tag>[-\w]+)/feed/(?P<feed_type>rss|atom)/$')
+    @route(r'^category/(?P<category>[-\w]+)/feed/(?P<feed_type>rss|atom)/$')
+    def feed(self, request, feed_type, tag=None, category=None, *args, **kwargs):
+        from blog.feeds import serve_feed
+        return serve_feed(request, self, feed_type, tag=tag, category=category)
+
+    # JSON listing of posts for widgets and partner sites, see blog/api.py
+    @route(r'^api/posts/$')
+    def posts_api(self, request, *args, **kwargs):
+        from blog.api import serve_posts_api
+        return serve_posts_api(request, self)
+
     @route(r'^$')
     def post_list(self, request, *args, **kwargs):
         self.posts = self.get_posts()
-        return Page.serve(self, request, *args, *kwargs)
+        return Page.serve(self, request, *args, **kwargs)
+
+# attach the parent BlogPage of many posts with a single query, blogs already at hand are
+# given as {path: blog} and not fetched again
+def attach_blog_pages(posts, blogs=None):
+    blogs = dict(blogs or {})
+    paths = set(post.path[:-post.steplen] for post in posts) - set(blogs)
+    if paths:
+        blogs.update((blog.path, blog) for blog in BlogPage.objects.filter(path__in=paths))
+    for post in posts:
+        if post.path[:-post.steplen] in blogs:
+            post._blog_page = blogs[post.path[:-post.steplen]]
+    return posts
+
+
+class PostPageQuerySet(PageQuerySet):
+
+    # posts of this queryset come with their blog_page already set, the posts of blog
+    # (usually the blog being served) get it without a query
+    def with_blog_page(self, blog=None):
+        clone = self._chain()
+        clone._blog_pages = {blog.path: blog} if blog is not None else {}
+        return clone
+
+    def _clone(self):
+        clone = super(PostPageQuerySet, self)._clone()
+        clone._blog_pages = getattr(self, '_blog_pages', None)
+        return clone
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super(PostPageQuerySet, self)._fetch_all()
+        if fetched and getattr(self, '_blog_pages', None) is not None:
+            posts = [post for post in self._result_cache if isinstance(post, PostPage)]
+            attach_blog_pages(posts, self._blog_pages)
+
+
+PostPageManager = PageManager.from_queryset(PostPageQuerySet)
+
 
 """class using for generating post"""
-class PostPage(Page):
+class PostPage(ConditionalGetMixin, ResponseCacheMixin, Page):
     body = RichTextField(blank=True)
     date = models.DateTimeField("Post date", default=datetime.datetime.today)
     categories = ParentalManyToManyField('blog.BlogCatagory', blank=True)
@@ -115,9 +234,33 @@ class PostPage(Page):
         FieldPanel('date')
     ]
 
+    objects = PostPageManager()
+
+    # keyset pagination of listings and the api walks (date, id) newest first, see blog/pagination.py
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', '-page_ptr'], name='blog_post_date_idx'),
+        ]
+
+    # parent blog is looked up once per instance, listings can set it for many posts
+    # at once with PostPage.objects.with_blog_page()
     @property
     def blog_page(self):
-        return self.get_parent().specific
+        if getattr(self, '_blog_page', None) is None:
+            parent_path = self.path[:-self.steplen]
+            self._blog_page = BlogPage.objects.filter(path=parent_path).first() or self.get_parent().specific
+        return self._blog_page
+
+    def get_cache_labels(self, request, *args, **kwargs):
+        return [post_label(self.slug), blog_page_label(self.path[:-self.steplen])]
+
+    # keep the archive index in step when a post is moved to another blog
+    def move(self, target, pos=None):
+        super(PostPage, self).move(target, pos=pos)
+        from blog.archive import index_post
+        from blog.cache import invalidate_post
+        post = PostPage.objects.get(pk=self.pk)
+        invalidate_post(post, index_post(post))
     
     def get_context(self, request, *args, **kwargs):
         context = super(PostPage, self).get_context(request, *args, **kwargs)
@@ -125,6 +268,22 @@ class PostPage(Page):
         context['post'] = self
         return context
 
+"""Archive index of live posts, one row per post, maintained by blog/archive.py"""
+class PostArchiveEntry(models.Model):
+    blog = models.ForeignKey('wagtailcore.Page', on_delete=models.CASCADE, related_name='+')
+    post = models.OneToOneField('PostPage', on_delete=models.CASCADE, related_name='archive_entry')
+    slug = models.SlugField(max_length=255, allow_unicode=True)
+    posted_at = models.DateTimeField()
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    day = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['blog', 'year', 'month', 'day', 'posted_at'], name='blog_archive_date_idx'),
+            models.Index(fields=['blog', 'year', 'month', 'day', 'slug'], name='blog_archive_slug_idx'),
+        ]
+
 @register_snippet
 class BlogCatagory(models.Model):
     name = models.CharField(max_length=250)
@@ -154,22 +313,17 @@ class Tag(TaggitTag):
 
 """ method for checking the file is svg or not """
 def validate_svg(f):
-    # Find "start" word in file and get "tag" from there
+    # The whole file is parsed, a DOCTYPE or entity declaration is refused
     f.seek(0)
-    tag = None
     try:
-        for event, el in et.iterparse(f, ('start',)):
-            tag = el.tag
-            break
+        parse(f.read())
+    except ValueError as e:
+        raise ValidationError(str(e))
     except et.ParseError:
-        pass
-
-    # Check that this "tag" is correct
-    if tag != '{http://www.w3.org/2000/svg}svg':
         raise ValidationError('Uploaded file is not an image or SVG file.')
-
-    # Do not forget to "reset" file
-    f.seek(0)
+    finally:
+        # Do not forget to "reset" file
+        f.seek(0)
 
     return f
 
@@ -178,13 +332,17 @@ def validate_svg(f):
 class SvgImage(models.Model):
     title = models.CharField(max_length=250)
     image = models.FileField(null=True, blank=True, validators=[validate_svg])
+    # sanitised and minified copy of image, written by blog.svg.optimize
+    optimized = models.FileField(null=True, blank=True, editable=False)
 
     # it's returning HTML format for list_display on wagtail_hooks.py
+    # every icon is a <use> of the shared sprite instead of a request per file
     def svgListDisplay(self):
         return format_html(
-            '<img src="{}" alt="{}" height="87px" width="100px" />',
-            self.image,
+            '<svg height="87" width="100" role="img" aria-label="{}"><use xlink:href="{}#{}"></use></svg>',
             self.title,
+            sprite_url(),
+            symbol_id(self),
         )
 
     panels = [
@@ -192,6 +350,13 @@ class SvgImage(models.Model):
         FieldPanel('image')
     ]
 
+    # a new upload is stored sanitised, the file as it was uploaded is never served
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            self.image.seek(0)
+            self.image = ContentFile(clean_svg(self.image.read()), name=self.image.name)
+        super(SvgImage, self).save(*args, **kwargs)
+
     def __str__(self):
         return self.title
 
@@ -0,0 +1,98 @@
+import base64
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+BLOG_PAGE_SIZE = getattr(settings, 'BLOG_PAGE_SIZE', 10)
+
+
+# cursor is the (date, id) of the row the page starts after, encoded to be safe in a query string
+def encode_cursor(date, pk):
+    value = '{0}|{1}'.format(date.isoformat(), pk)
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date, pk = value.split('|')
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (TypeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return date, pk
+
+
+# read the key of a row, rows can be model instances or dicts from values()
+def row_key(row):
+    if isinstance(row, dict):
+        return row['date'], row['id']
+    return row.date, row.pk
+
+
+"""Keyset pagination over (date, id), newest first.
+
+Instead of OFFSET every page is a range query starting from the cursor of the
+previous page, so page 100 costs the same as page 1. `after` walks to older
+posts and `before` walks back to newer ones.
+"""
+class KeysetPaginator(object):
+
+    def __init__(self, queryset, per_page=None):
+        self.queryset = queryset
+        self.per_page = per_page or BLOG_PAGE_SIZE
+
+    def page(self, after=None, before=None):
+        after = decode_cursor(after) if after else None
+        before = decode_cursor(before) if before else None
+
+        if before:
+            date, pk = before
+            rows = list(
+                self.queryset.filter(Q(date__gt=date) | Q(date=date, pk__gt=pk))
+                .order_by('date', 'pk')[:self.per_page + 1]
+            )
+            has_newer = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            has_older = True
+        else:
+            queryset = self.queryset
+            if after:
+                date, pk = after
+                queryset = queryset.filter(Q(date__lt=date) | Q(date=date, pk__lt=pk))
+            rows = list(queryset.order_by('-date', '-pk')[:self.per_page + 1])
+            has_older = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_newer = bool(after)
+
+        return KeysetPage(rows, has_older, has_newer)
+
+
+class KeysetPage(object):
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next and bool(object_list)
+        self.has_previous = has_previous and bool(object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if self.has_next:
+            return encode_cursor(*row_key(self.object_list[-1]))
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous:
+            return encode_cursor(*row_key(self.object_list[0]))
+        return None
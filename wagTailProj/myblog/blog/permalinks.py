@@ -0,0 +1,45 @@
+from blog.dates import post_local_date
+
+
+"""Builds post permalinks of one blog without reversing the route per post.
+
+The blog url is resolved once, after that every permalink is plain string
+formatting with the same shape as the BlogPage.post_by_date_slug route.
+A blog outside every site has no url, its permalinks are then None.
+"""
+class PostPermalinks(object):
+
+    def __init__(self, blog_page, request=None, absolute=False):
+        if absolute:
+            url_parts = blog_page.get_url_parts(request=request)
+            self.base_url = url_parts[1] + url_parts[2] if url_parts else None
+        else:
+            self.base_url = blog_page.get_url(request=request)
+
+    def url(self, post):
+        return self.url_for(post.date, post.slug)
+
+    # same as url() for rows coming from values()
+    def url_for(self, date, slug):
+        if self.base_url is None:
+            return None
+        post_date = post_local_date(date)
+        return '{0}{1:04}/{2:02}/{3:02}/{4}/'.format(
+            self.base_url, post_date.year, post_date.month, post_date.day, slug
+        )
+
+    def urls(self, posts):
+        return [(post, self.url(post)) for post in posts]
+
+
+# one builder per blog per request, so a listing resolves the blog url only once
+def get_permalinks(blog_page, request=None, absolute=False):
+    if request is None:
+        return PostPermalinks(blog_page, absolute=absolute)
+
+    if not hasattr(request, '_post_permalinks'):
+        request._post_permalinks = {}
+    key = (blog_page.pk, absolute)
+    if key not in request._post_permalinks:
+        request._post_permalinks[key] = PostPermalinks(blog_page, request, absolute=absolute)
+    return request._post_permalinks[key]
@@ -0,0 +1,86 @@
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from taggit.models import Tag as TaggitTag
+from wagtail.core.signals import page_published, page_unpublished
+
+from blog.archive import index_post, indexed_locations, unindex_post
+from blog.cache import blog_label, blog_page_label, category_label, invalidate, invalidate_post, post_label, tag_label
+from blog.models import BlogCatagory, BlogPage, PostArchiveEntry, PostPage, SvgImage, Tag
+from blog.svg import forget_sprite_name, optimize
+
+
+@receiver(page_published, sender=PostPage)
+def post_published(sender, instance, **kwargs):
+    invalidate_post(instance, index_post(instance))
+
+
+@receiver(page_unpublished, sender=PostPage)
+def post_unpublished(sender, instance, **kwargs):
+    invalidate_post(instance, unindex_post(instance))
+
+
+@receiver(pre_delete, sender=PostPage)
+def post_deleted(sender, instance, **kwargs):
+    invalidate_post(instance, indexed_locations(instance))
+
+
+@receiver(page_published, sender=BlogPage)
+@receiver(page_unpublished, sender=BlogPage)
+def blog_published(sender, instance, **kwargs):
+    invalidate(blog_label(instance.pk), blog_page_label(instance.path))
+
+
+# slug of a tag or category before it is saved, so listings under the old URL are dropped too
+def remember_slug(sender, instance, **kwargs):
+    instance._cached_slug = sender.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+# drop the listing of a tag or category under its old and new slug, the posts showing it
+# and the listings of the blogs they are in
+def invalidate_listing(label, instance, posts):
+    slugs = {instance.slug, getattr(instance, '_cached_slug', None)}
+    labels = [label(slug) for slug in slugs if slug]
+    labels += [post_label(slug) for slug in posts.values_list('slug', flat=True)]
+    blog_ids = PostArchiveEntry.objects.filter(post_id__in=posts.values('pk')).values_list('blog_id', flat=True)
+    labels += [blog_label(blog_id) for blog_id in set(blog_ids)]
+    invalidate(*labels)
+
+
+def tag_changed(sender, instance, **kwargs):
+    invalidate_listing(tag_label, instance, PostPage.objects.filter(tags__pk=instance.pk))
+
+
+for tag_model in (TaggitTag, Tag):
+    pre_save.connect(remember_slug, sender=tag_model)
+    post_save.connect(tag_changed, sender=tag_model)
+    pre_delete.connect(tag_changed, sender=tag_model)
+
+
+@receiver(pre_save, sender=BlogCatagory)
+def category_saving(sender, instance, **kwargs):
+    remember_slug(sender, instance)
+
+
+@receiver(post_save, sender=BlogCatagory)
+@receiver(pre_delete, sender=BlogCatagory)
+def category_changed(sender, instance, **kwargs):
+    invalidate_listing(category_label, instance, PostPage.objects.filter(categories__pk=instance.pk))
+
+
+# the sprite name is a hash of the optimized copies (see blog/svg.py), it is looked up again
+# by the next request of every process
+@receiver(post_save, sender=SvgImage)
+def svg_saved(sender, instance, **kwargs):
+    optimize(instance)
+    forget_sprite_name()
+
+
+@receiver(post_delete, sender=SvgImage)
+def svg_deleted(sender, instance, **kwargs):
+    forget_sprite_name()
+
+
+@receiver(request_started)
+def request_started_handler(**kwargs):
+    forget_sprite_name()
@@ -0,0 +1,269 @@
+import hashlib
+import re
+import threading
+import xml.etree.ElementTree as et
+from xml.parsers import expat
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+
+# decimals kept for coordinates and lengths
+SVG_PRECISION = getattr(settings, 'SVG_PRECISION', 3)
+
+# The only elements and attributes kept, everything else is dropped. There are no
+# scripts, animations (<set> and <animate> can rewrite a link to javascript: at
+# runtime), <style>, style attributes, links or elements loading other documents
+ALLOWED_TAGS = {
+    'svg', 'g', 'defs', 'symbol', 'use', 'title', 'desc',
+    'path', 'rect', 'circle', 'ellipse', 'line', 'polyline', 'polygon',
+    'text', 'tspan', 'textPath',
+    'linearGradient', 'radialGradient', 'stop', 'clipPath', 'mask', 'pattern', 'marker',
+    'filter', 'feBlend', 'feColorMatrix', 'feComposite', 'feFlood', 'feGaussianBlur',
+    'feMerge', 'feMergeNode', 'feOffset',
+}
+ALLOWED_ATTRIBUTES = {
+    'id', 'class', 'viewBox', 'preserveAspectRatio', 'width', 'height', 'transform',
+    'x', 'y', 'x1', 'x2', 'y1', 'y2', 'cx', 'cy', 'r', 'rx', 'ry', 'fx', 'fy', 'd', 'points',
+    'fill', 'fill-opacity', 'fill-rule', 'stroke', 'stroke-width', 'stroke-linecap', 'stroke-linejoin',
+    'stroke-miterlimit', 'stroke-dasharray', 'stroke-dashoffset', 'stroke-opacity',
+    'opacity', 'color', 'display', 'visibility', 'clip-path', 'clip-rule', 'mask', 'filter',
+    'offset', 'stop-color', 'stop-opacity', 'gradientUnits', 'gradientTransform', 'spreadMethod',
+    'patternUnits', 'patternContentUnits', 'patternTransform', 'clipPathUnits', 'maskUnits',
+    'maskContentUnits', 'markerWidth', 'markerHeight', 'markerUnits', 'refX', 'refY', 'orient',
+    'marker-start', 'marker-mid', 'marker-end', 'filterUnits', 'primitiveUnits',
+    'in', 'in2', 'result', 'stdDeviation', 'mode', 'type', 'values', 'operator', 'k1', 'k2', 'k3', 'k4',
+    'dx', 'dy', 'flood-color', 'flood-opacity',
+    'font-family', 'font-size', 'font-weight', 'font-style', 'text-anchor', 'dominant-baseline',
+    'letter-spacing', 'rotate', 'textLength', 'lengthAdjust', 'startOffset',
+    'href', 'role', 'aria-label', 'aria-hidden',
+}
+# elements whose text is content, whitespace in them is kept
+TEXT_TAGS = {'text', 'tspan', 'textPath'}
+NUMERIC_ATTRIBUTES = {
+    'd', 'points', 'transform', 'viewBox', 'x', 'y', 'x1', 'x2', 'y1', 'y2',
+    'cx', 'cy', 'r', 'rx', 'ry', 'width', 'height', 'stroke-width', 'offset',
+}
+
+NUMBER_RE = re.compile(r'-?\d*\.\d+(?:e-?\d+)?')
+WHITESPACE_RE = re.compile(r'\s+')
+URL_REFERENCE_RE = re.compile(r'url\(\s*#([^)\s]+)\s*\)')
+# url(#id) pointing inside the document is the only url() an attribute may hold
+LOCAL_URL_RE = re.compile(r'url\(["\']?#[-\w.:]+["\']?\)')
+# whitespace and control characters browsers skip inside a scheme like "java\tscript:"
+IGNORED_CHARACTERS_RE = re.compile(r'[\x00-\x20]+')
+
+et.register_namespace('', SVG_NS)
+et.register_namespace('xlink', XLINK_NS)
+
+
+def local_name(name):
+    return name.rsplit('}', 1)[-1]
+
+
+def namespace(name):
+    return name[1:].split('}', 1)[0] if name.startswith('{') else ''
+
+
+def short_number(match):
+    number = ('%.*f' % (SVG_PRECISION, float(match.group(0)))).rstrip('0').rstrip('.')
+    if number.startswith('0.'):
+        number = number[1:]
+    elif number.startswith('-0.'):
+        number = '-' + number[2:]
+    return number if number not in ('', '-', '-0') else '0'
+
+
+# refuse DOCTYPE and entity declarations, entities are never expanded and
+# can't pull in external documents. Raises ValueError
+def check_declarations(data):
+    def refuse(*args):
+        raise ValueError('SVG files with a DOCTYPE or entities are not accepted')
+
+    parser = expat.ParserCreate()
+    parser.StartDoctypeDeclHandler = refuse
+    parser.EntityDeclHandler = refuse
+    try:
+        parser.Parse(data, True)
+    except expat.ExpatError:
+        raise ValueError('Not an SVG document')
+
+
+def parse(data):
+    check_declarations(data)
+    root = et.fromstring(data)
+    if root.tag != '{%s}svg' % SVG_NS:
+        raise ValueError('Not an SVG document')
+    return root
+
+
+def is_safe_value(attribute, value):
+    compact = IGNORED_CHARACTERS_RE.sub('', value).lower()
+    if attribute == 'href':
+        return compact.startswith('#')
+    if 'javascript:' in compact:
+        return False
+    return compact.count('url(') == len(LOCAL_URL_RE.findall(compact))
+
+
+# Keep only ALLOWED_TAGS and ALLOWED_ATTRIBUTES, links pointing inside the
+# document and url() values referencing an id. Comments are already dropped by the parser
+# (migration 0011 has a copy of the sanitiser as it was)
+def sanitize(element):
+    for child in list(element):
+        if namespace(child.tag) != SVG_NS or local_name(child.tag) not in ALLOWED_TAGS:
+            element.remove(child)
+        else:
+            sanitize(child)
+
+    for name in list(element.attrib):
+        ns, attribute = namespace(name), local_name(name)
+        if (
+            ns not in ('', XLINK_NS)
+            or (ns == XLINK_NS and attribute != 'href')
+            or attribute not in ALLOWED_ATTRIBUTES
+            or not is_safe_value(attribute, element.attrib[name])
+        ):
+            del element.attrib[name]
+    return element
+
+
+def minify(element, keep_whitespace=False):
+    keep_whitespace = keep_whitespace or local_name(element.tag) in TEXT_TAGS
+    if not keep_whitespace:
+        element.text = element.text.strip() or None if element.text else None
+    for child in element:
+        minify(child, keep_whitespace)
+        if not keep_whitespace:
+            child.tail = None
+
+    for name, value in element.attrib.items():
+        value = WHITESPACE_RE.sub(' ', value).strip()
+        if local_name(name) in NUMERIC_ATTRIBUTES:
+            value = NUMBER_RE.sub(short_number, value)
+        element.set(name, value)
+    return element
+
+
+# the sanitised document, what is stored for an upload
+def clean_svg(data):
+    return et.tostring(sanitize(parse(data)), encoding='utf-8')
+
+
+def optimize_svg(data):
+    return et.tostring(minify(sanitize(parse(data))), encoding='utf-8')
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+# Write the optimized copy of svg_image.image next to the upload, named by the
+# hash of the source so an unchanged upload is never processed twice.
+# Files that can't be made safe get no copy and are left out of the sprite
+def optimize(svg_image):
+    if not svg_image.image:
+        return None
+    with svg_image.image.open('rb') as f:
+        data = f.read()
+    name = 'svg/optimized/%s.svg' % content_hash(data)
+    if svg_image.optimized.name != name:
+        if not default_storage.exists(name):
+            try:
+                default_storage.save(name, ContentFile(optimize_svg(data)))
+            except (ValueError, et.ParseError):
+                return None
+        svg_image.optimized.name = name
+        type(svg_image).objects.filter(pk=svg_image.pk).update(optimized=name)
+    return name
+
+
+def symbol_id(svg_image):
+    return 'svg-%d' % svg_image.pk
+
+
+# ids inside a symbol are prefixed so icons using the same ids don't clash in the sprite
+def prefix_ids(element, prefix):
+    ids = {node.get('id') for node in element.iter() if node.get('id')}
+    if not ids:
+        return element
+
+    def reference(match):
+        return 'url(#%s%s)' % (prefix, match.group(1)) if match.group(1) in ids else match.group(0)
+
+    for node in element.iter():
+        for name, value in node.attrib.items():
+            if local_name(name) == 'id' and value in ids:
+                node.set(name, prefix + value)
+            elif local_name(name) == 'href' and value[1:] in ids:
+                node.set(name, '#' + prefix + value[1:])
+            elif 'url(' in value:
+                node.set(name, URL_REFERENCE_RE.sub(reference, value))
+    return element
+
+
+def symbol(svg_image):
+    name = optimize(svg_image)
+    if name is None:
+        raise ValueError('%s has no optimized copy' % svg_image)
+    with default_storage.open(name, 'rb') as f:
+        root = et.fromstring(f.read())
+    element = et.Element('{%s}symbol' % SVG_NS, id=symbol_id(svg_image))
+    view_box = root.get('viewBox')
+    if not view_box and root.get('width') and root.get('height'):
+        view_box = '0 0 %s %s' % (root.get('width'), root.get('height'))
+    if view_box:
+        element.set('viewBox', view_box)
+    element.extend(prefix_ids(root, symbol_id(svg_image) + '-'))
+    return element
+
+
+def build_sprite():
+    SvgImage = apps.get_model('blog', 'SvgImage')
+    sprite = et.Element('{%s}svg' % SVG_NS)
+    for svg_image in SvgImage.objects.exclude(image='').exclude(image=None).order_by('pk'):
+        try:
+            sprite.append(symbol(svg_image))
+        except (ValueError, et.ParseError, IOError):
+            continue
+    return et.tostring(sprite, encoding='utf-8')
+
+
+# Name of the sprite holding every SvgImage as a <symbol>. The name is a hash of the
+# files it is built from, read from the database once per request (see forget_sprite_name)
+# so every process sees a new upload from its next request. Sprites are never rewritten,
+# browsers and proxies can cache them for good
+def sprite_name():
+    name = getattr(_memo, 'sprite_name', None)
+    if name is not None:
+        return name
+    SvgImage = apps.get_model('blog', 'SvgImage')
+    files = SvgImage.objects.exclude(image='').exclude(image=None).order_by('pk').values_list(
+        'pk', 'image', 'optimized'
+    )
+    name = 'svg/sprite-%s.svg' % content_hash(repr(list(files)).encode())
+    if name not in written_sprites:
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(build_sprite()))
+        written_sprites.add(name)
+    _memo.sprite_name = name
+    return name
+
+
+# called when a request starts and when an SvgImage changes in this process
+def forget_sprite_name():
+    _memo.__dict__.pop('sprite_name', None)
+
+
+# names of sprites known to be in storage
+written_sprites = set()
+# sprite name of the request handled by this thread
+_memo = threading.local()
+
+
+def sprite_url():
+    return default_storage.url(sprite_name())
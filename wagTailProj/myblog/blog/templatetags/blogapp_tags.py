@@ -1,18 +1,32 @@
 from django.template import Library, loader
 #from django.core.urlresolvers import resolve
 
+from django.utils.html import format_html
+
+from blog.permalinks import get_permalinks
+from blog.svg import sprite_url, symbol_id
+
 register = Library()
 
-@register.simple_tag()
-def post_date_url(post, blog_page):
-    post_date = post.date
-    url = blog_page.url + blog_page.reverse_subpage(
-        'post_by_date_slug',
-        args=(
-            post_date.year,
-            '{0:02}'.format(post_date.month),
-            '{0:02}'.format(post_date.day),
-            post.slug,
-        )
+# the blog url is resolved once per request and shared by every post of the listing,
+# a blog that can't be routed to from any site gives no url
+@register.simple_tag(takes_context=True)
+def post_date_url(context, post, blog_page):
+    return get_permalinks(blog_page, context.get('request')).url(post) or ''
+
+
+@register.simple_tag
+def svg_sprite_url():
+    return sprite_url()
+
+
+# {% svg_icon svg_image "icon" %} draws an SvgImage from the sprite with <use>
+@register.simple_tag
+def svg_icon(svg_image, css_class=''):
+    return format_html(
+        '<svg class="{}" role="img" aria-label="{}"><use xlink:href="{}#{}"></use></svg>',
+        css_class,
+        svg_image.title,
+        sprite_url(),
+        symbol_id(svg_image),
     )
-    return url
\ No newline at end of file
@@ -1,3 +1,300 @@
-from django.test import TestCase
+import datetime
+import io
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.signals import request_started
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from wagtail.core.models import Page, Site
+
+from base.labels import SNIPPETS_LABEL, get_versions, invalidate
+from base.utils import set_snippets_updated_at
+from blog.cache import blog_label, blog_page_label, post_label, response_key, tag_label
+from blog.dates import post_local_date
+from blog.models import BlogPage, PostPage, SvgImage, validate_svg
+from blog.pagination import KeysetPaginator, decode_cursor, encode_cursor
+from blog.permalinks import PostPermalinks
+from blog.svg import clean_svg, forget_sprite_name, sprite_name
+
+
+def make_blog():
+    root = Page.objects.get(depth=1)
+    return root.add_child(instance=BlogPage(title='Blog', slug='blog'))
+
+
+def make_post(blog, slug, date):
+    return blog.add_child(instance=PostPage(title=slug, slug=slug, date=date))
+
+
+class CacheInvalidationTests(TestCase):
+
+    def test_invalidate_only_bumps_given_labels(self):
+        before = get_versions(['a', 'b'])
+        self.assertEqual(before, get_versions(['a', 'b']))
+        invalidate('a')
+        after = get_versions(['a', 'b'])
+        self.assertNotEqual(before[0], after[0])
+        self.assertEqual(before[1], after[1])
+
+    def test_post_publish_invalidates_post_and_blog(self):
+        blog = make_blog()
+        post = make_post(blog, 'first', timezone.now())
+        labels = [blog_label(blog.pk), post_label(post.slug), blog_page_label(blog.path)]
+        before = get_versions(labels)
+
+        post.save_revision().publish()
+
+        after = get_versions(labels)
+        self.assertNotEqual(before[0], after[0])
+        self.assertNotEqual(before[1], after[1])
+        self.assertEqual(before[2], after[2])
+
+    def test_blog_publish_invalidates_its_permalinks(self):
+        blog = make_blog()
+        post = make_post(blog, 'first', timezone.now())
+        labels = post.get_cache_labels(RequestFactory().get('/'))
+        before = get_versions(labels)
+
+        blog.save_revision().publish()
+
+        self.assertNotEqual(before, get_versions(labels))
+
+    def test_response_key_follows_snippets(self):
+        blog = make_blog()
+        request = RequestFactory().get('/blog/', {'page': '2'})
+        key = response_key(request, blog, 'serve', [blog_label(blog.pk)])
+        self.assertEqual(key, response_key(request, blog, 'serve', [blog_label(blog.pk)]))
+
+        invalidate(SNIPPETS_LABEL)
+
+        self.assertNotEqual(key, response_key(request, blog, 'serve', [blog_label(blog.pk)]))
+
+    def test_api_responses_follow_the_filtered_tag(self):
+        blog = make_blog()
+        request = RequestFactory().get('/blog/api/posts/', {'tag': 'django'})
+        labels = blog.get_cache_labels(request, blog.posts_api, [], {})
+        self.assertEqual(labels, [blog_label(blog.pk), tag_label('django')])
+
+
+class BlogPageOfPostsTests(TestCase):
+
+    def setUp(self):
+        self.blog = make_blog()
+        self.other = Page.objects.get(depth=1).add_child(instance=BlogPage(title='Other', slug='other'))
+        for blog in (self.blog, self.other):
+            make_post(blog, 'post-%d' % blog.pk, timezone.now())
+
+    def test_blogs_are_fetched_with_the_posts(self):
+        with self.assertNumQueries(2):
+            posts = list(PostPage.objects.order_by('pk').with_blog_page())
+        with self.assertNumQueries(0):
+            self.assertEqual([post.blog_page for post in posts], [self.blog, self.other])
+
+    def test_given_blog_is_not_fetched_again(self):
+        with self.assertNumQueries(1):
+            posts = list(PostPage.objects.child_of(self.blog).with_blog_page(self.blog))
+            self.assertIs(posts[0].blog_page, self.blog)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        site_root = Site.objects.get(is_default_site=True).root_page
+        blog = site_root.add_child(instance=BlogPage(title='Blog', slug='blog'))
+        post = make_post(blog, 'first', timezone.now())
+        post.save_revision().publish()
+        self.post = PostPage.objects.get(pk=post.pk)
+        set_snippets_updated_at(None)
+
+    def test_unchanged_post_is_not_modified_since(self):
+        response = self.client.get(self.post.url)
+        last_modified = http_date(int(self.post.last_published_at.timestamp()))
+        self.assertEqual(response['Last-Modified'], last_modified)
+        self.assertEqual(self.client.get(self.post.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_snippet_change_moves_last_modified(self):
+        last_modified = http_date(int(self.post.last_published_at.timestamp()))
+        set_snippets_updated_at(self.post.last_published_at + datetime.timedelta(hours=1))
+        response = self.client.get(self.post.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['Last-Modified'], last_modified)
+
+
+class PermalinkTests(TestCase):
+
+    def test_permalink_follows_the_date_route(self):
+        site_root = Site.objects.get(is_default_site=True).root_page
+        blog = site_root.add_child(instance=BlogPage(title='Blog', slug='blog'))
+        date = timezone.make_aware(datetime.datetime(2018, 6, 1, 12))
+        self.assertEqual(PostPermalinks(blog).url_for(date, 'first'), '/blog/2018/06/01/first/')
+
+    def test_blog_outside_every_site_has_no_permalinks(self):
+        blog = make_blog()
+        self.assertIsNone(PostPermalinks(blog).url_for(timezone.now(), 'first'))
+        self.assertIsNone(PostPermalinks(blog, absolute=True).url_for(timezone.now(), 'first'))
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        blog = make_blog()
+        day = timezone.make_aware(datetime.datetime(2018, 6, 1, 12))
+        # two posts share every date, their order is decided by id
+        for number in range(7):
+            make_post(blog, 'post-%d' % number, day - datetime.timedelta(days=number // 2))
+        self.posts = PostPage.objects.all()
+        self.newest_first = list(self.posts.order_by('-date', '-pk'))
+
+    def walk(self, paginator):
+        pages = [paginator.page()]
+        while pages[-1].next_cursor:
+            pages.append(paginator.page(after=pages[-1].next_cursor))
+        return pages
+
+    def test_walking_forward_sees_every_post_once(self):
+        pages = self.walk(KeysetPaginator(self.posts, per_page=2))
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual([post for page in pages for post in page], self.newest_first)
+        self.assertIsNone(pages[0].previous_cursor)
+        self.assertIsNone(pages[-1].next_cursor)
+
+    def test_walking_back_gives_the_same_pages(self):
+        paginator = KeysetPaginator(self.posts, per_page=2)
+        pages = self.walk(paginator)
+        for newer, older in zip(pages, pages[1:]):
+            self.assertEqual(list(paginator.page(before=older.previous_cursor)), list(newer))
+        self.assertIsNone(paginator.page(before=pages[1].previous_cursor).previous_cursor)
+
+    def test_exact_multiple_of_the_page_size(self):
+        pages = self.walk(KeysetPaginator(self.posts.exclude(pk=self.newest_first[-1].pk), per_page=3))
+        self.assertEqual([len(page) for page in pages], [3, 3])
+
+    def test_cursor_past_the_oldest_post_is_empty(self):
+        oldest = self.newest_first[-1]
+        page = KeysetPaginator(self.posts, per_page=2).page(after=encode_cursor(oldest.date, oldest.pk))
+        self.assertEqual(list(page), [])
+        self.assertIsNone(page.next_cursor)
+        self.assertIsNone(page.previous_cursor)
+
+    def test_invalid_cursor_starts_at_the_newest_post(self):
+        self.assertIsNone(decode_cursor('not a cursor'))
+        page = KeysetPaginator(self.posts, per_page=2).page(after='not a cursor')
+        self.assertEqual(list(page), self.newest_first[:2])
+
+
+class PostLocalDateTests(SimpleTestCase):
+
+    def test_aware_dates_are_shown_in_the_current_timezone(self):
+        value = datetime.datetime(2018, 6, 1, 20, tzinfo=timezone.utc)
+        with timezone.override('Asia/Dhaka'):
+            self.assertEqual(post_local_date(value), datetime.date(2018, 6, 2))
+        self.assertEqual(post_local_date(value.replace(tzinfo=None)), datetime.date(2018, 6, 1))
+
+
+def svg(body):
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink">%s</svg>' % body
+    ).encode()
+
+
+class SvgSanitizerTests(SimpleTestCase):
+
+    def assertStripped(self, body, *fragments):
+        cleaned = clean_svg(svg(body)).decode()
+        for fragment in fragments:
+            self.assertNotIn(fragment, cleaned)
+        return cleaned
+
+    def test_scripts_and_animations_are_dropped(self):
+        self.assertStripped(
+            '<script>alert(1)</script>'
+            '<use xlink:href="#icon"><set attributeName="xlink:href" to="javascript:alert(1)"/></use>'
+            '<animate attributeName="href" values="javascript:alert(1)"/>'
+            '<a href="javascript:alert(1)"><circle r="1"/></a>'
+            '<foreignObject><iframe src="javascript:alert(1)"/></foreignObject>',
+            'script', 'set', 'animate', 'javascript', 'iframe', 'foreignObject', '<a',
+        )
+
+    def test_styles_and_event_handlers_are_dropped(self):
+        self.assertStripped(
+            '<style>rect { fill: url(https://example.com/track) }</style>'
+            '<rect onload="alert(1)" style="fill: url(https://example.com/track)" width="1"/>',
+            'style', 'onload', 'example.com',
+        )
+
+    def test_only_local_links_and_urls_are_kept(self):
+        cleaned = self.assertStripped(
+            '<image href="https://example.com/a.png"/>'
+            '<use xlink:href="jav&#x09;ascript:alert(1)"/>'
+            '<rect fill="url(https://example.com/a#b)" stroke="url(#a) url(//example.com)" width="2"/>'
+            '<rect filter="javascript:alert(1)" clip-path="url(#clip)" width="3"/>'
+            '<use href="#icon"/>',
+            'image', 'example.com', 'ascript',
+        )
+        self.assertIn('clip-path="url(#clip)"', cleaned)
+        self.assertIn('href="#icon"', cleaned)
+
+    def test_declarations_are_refused(self):
+        for data in (
+            b'<!DOCTYPE svg [<!ENTITY a "aaaaaaaaaa"><!ENTITY b "&a;&a;&a;&a;&a;">]>'
+            b'<svg xmlns="http://www.w3.org/2000/svg"><text>&b;</text></svg>',
+            b'<!DOCTYPE svg SYSTEM "file:///etc/passwd"><svg xmlns="http://www.w3.org/2000/svg"/>',
+            b'<html/>',
+            b'not xml',
+        ):
+            with self.assertRaises(ValueError):
+                clean_svg(data)
+            with self.assertRaises(ValidationError):
+                validate_svg(io.BytesIO(data))
+
+    def test_validation_accepts_svg(self):
+        f = io.BytesIO(svg('<circle r="1"/>'))
+        self.assertIs(validate_svg(f), f)
+        self.assertEqual(f.tell(), 0)
+
+
+class SvgImageTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, body):
+        return SvgImage.objects.create(title='Icon', image=ContentFile(svg(body), name='icon.svg'))
+
+    def test_upload_is_stored_sanitised(self):
+        svg_image = self.upload('<circle r="1" onclick="alert(1)"/><script>alert(1)</script>')
+        with svg_image.image.open('rb') as f:
+            data = f.read()
+        self.assertIn(b'circle', data)
+        self.assertNotIn(b'alert', data)
+
+    def test_sprite_follows_uploads(self):
+        self.upload('<circle r="1"/>')
+        name = sprite_name()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(sprite_name(), name)
+
+        self.upload('<rect width="1"/>')
+        self.assertNotEqual(sprite_name(), name)
+
+    def test_sprite_name_is_looked_up_once_per_request(self):
+        self.upload('<circle r="1"/>')
+        name = sprite_name()
+        forget_sprite_name()
+        with self.assertNumQueries(1):
+            self.assertEqual([sprite_name() for _ in range(3)], [name] * 3)
+
+        request_started.send(sender=None)
+        with self.assertNumQueries(1):
+            sprite_name()
@@ -2,6 +2,8 @@ from django.db import models
 
 from wagtail.core.models import Page
 
+from base.mixins import ConditionalGetMixin
 
-class HomePage(Page):
+
+class HomePage(ConditionalGetMixin, Page):
     pass
@@ -54,10 +54,13 @@ INSTALLED_APPS = [
     "wagtail.contrib.routable_page",    # routable page
     'wagtailmarkdown',                  # for markdown field help
     'blog',
+    'renditions',
     'wagtailhyper',
 ]
 
 MIDDLEWARE = [
+    # first, so it minifies and compresses the final response
+    'base.middlewares.MinifyHTMLMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,9 +70,14 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
 
     'wagtail.core.middleware.SiteMiddleware',
+    # needs request.site
+    'base.middlewares.ThemeMiddleware',
     'wagtail.contrib.redirects.middleware.RedirectMiddleware',
 ]
 
+# minify HTML responses in MinifyHTMLMiddleware, cached blog pages are stored minified
+COMPRESS_HTML = True
+
 ROOT_URLCONF = 'myblog.urls'
 
 TEMPLATES = [
@@ -105,6 +113,24 @@ DATABASES = {
 }
 
 
+# Cache
+# The response, search and sitemap caches and the label versions that invalidate
+# them are shared by every worker process through this cache, a per process cache
+# (LocMemCache, Django's default) would keep serving stale pages in the other
+# workers. Any shared backend works (Redis, Memcached), the table of the database
+# cache is created with "python manage.py createcachetable"
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
 
@@ -161,6 +187,25 @@ MEDIA_URL = '/media/'
 
 WAGTAIL_SITE_NAME = "myblog"
 
+# Full-text search on the project's SQLite database, run "./manage.py update_index" after switching
+WAGTAILSEARCH_BACKENDS = {
+    'default': {
+        'BACKEND': 'sqlitefts.backends',
+    }
+}
+
+# Search hits that couldn't be written to the database wait here for the next flush, keep it
+# out of the source tree (var/ is ignored by git) and on a volume if the container is replaced
+SEARCH_HITS_SPOOL_DIR = os.path.join(BASE_DIR, 'var', 'search_hits')
+
+# Image fields of our pages and the filter specs the templates render them at. Renditions are
+# queued when a page is published or an image uploaded and generated by a background thread
+# of the web process, "./manage.py prewarm_renditions --all" backfills the image library
+RENDITION_SPECS = {
+    'primary_image': ['width-800'],
+    'og_image': ['fill-1200x630'],
+}
+
 # Base URL to use when referring to full URLs within the Wagtail admin backend -
 # e.g. in notification emails. Don't include '/admin' or a trailing slash
 BASE_URL = 'http://example.com'
@@ -7,6 +7,7 @@ from wagtail.core import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
 
 from search import views as search_views
+from base import views as base_views
 
 urlpatterns = [
     url(r'^django-admin/', admin.site.urls),
@@ -15,6 +16,10 @@ urlpatterns = [
     url(r'^documents/', include(wagtaildocs_urls)),
 
     url(r'^search/$', search_views.search, name='search'),
+    url(r'^search/autocomplete/$', search_views.autocomplete, name='search_autocomplete'),
+
+    url(r'^sitemap\.xml$', base_views.sitemap_index, name='sitemap'),
+    url(r'^sitemap-(\d+)\.xml$', base_views.sitemap_shard, name='sitemap_shard'),
 
     # For anything not caught by a more specific rule above, hand over to
     # Wagtail's page serving mechanism. This should be the last pattern in
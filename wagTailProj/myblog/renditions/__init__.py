@@ -0,0 +1,2 @@
+"""Rendition pre-warming and responsive images, configured by the RENDITION_SPECS setting."""
+default_app_config = 'renditions.apps.RenditionsConfig'
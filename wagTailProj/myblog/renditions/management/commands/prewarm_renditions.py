@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from wagtail.images import get_image_model
+
+from renditions.prewarm import RENDITION_WORKERS, drain, generate
+from renditions.specs import all_specs
+
+
+class Command(BaseCommand):
+    help = 'Generate the queued renditions, or with --all the renditions our templates use for every image'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Backfill the whole image library')
+        parser.add_argument('--workers', type=int, default=RENDITION_WORKERS)
+        parser.add_argument('--loop', type=int, default=0, help='Keep draining the queue every LOOP seconds')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            specs = all_specs()
+            self.stdout.write('Generating %s with %d workers' % (', '.join(specs), options['workers']))
+            image_ids = get_image_model().objects.values_list('pk', flat=True)
+            renditions = {image_id: specs for image_id in image_ids}
+            generated = generate(renditions, options['workers'])
+            self.stdout.write('%d renditions ready for %d images' % (generated, len(renditions)))
+            return
+
+        while True:
+            generated, images = drain(options['workers'])
+            if images or not options['loop']:
+                self.stdout.write('%d renditions ready for %d images' % (generated, images))
+            if not options['loop']:
+                return
+            time.sleep(options['loop'])
@@ -0,0 +1,118 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, connection, connections, transaction
+from wagtail.images import get_image_model
+from wagtail.images.exceptions import InvalidFilterSpecError
+
+from renditions.models import PendingRendition
+from renditions.specs import add_specs
+
+# processes of the prewarm_renditions command
+RENDITION_WORKERS = getattr(settings, 'RENDITION_WORKERS', 2)
+# threads of a web process draining the queue after a publish or upload
+RENDITION_THREADS = getattr(settings, 'RENDITION_THREADS', 1)
+# queued renditions handed to the workers at once
+RENDITION_BATCH_SIZE = getattr(settings, 'RENDITION_BATCH_SIZE', 200)
+
+"""
+Renditions generated ahead of the first visitor.
+
+Requests queue the renditions a published page or an uploaded image needs,
+in the same transaction, and kick() starts draining the queue once it
+commits. The prewarm_renditions command drains it in a pool of
+RENDITION_WORKERS processes, for backfills and as a backstop with --loop.
+Renditions still missing when a page is shown are made on the fly by
+Wagtail as before.
+"""
+
+
+# queue {image id: [filter specs]}, they are generated once the transaction commits
+def enqueue(renditions):
+    pending = [
+        PendingRendition(image_id=image_id, filter_spec=spec)
+        for image_id, specs in renditions.items() for spec in specs
+    ]
+    if pending:
+        PendingRendition.objects.bulk_create(pending)
+        transaction.on_commit(kick)
+
+
+# Runs in a worker, returns the number of renditions that exist afterwards
+def generate_renditions(image_id, specs):
+    Image = get_image_model()
+    try:
+        image = Image.objects.get(pk=image_id)
+    except Image.DoesNotExist:
+        return 0
+    generated = 0
+    for spec in specs:
+        try:
+            image.get_rendition(spec)
+        except IntegrityError:
+            # made by another worker in the meantime
+            pass
+        except (IOError, InvalidFilterSpecError):
+            continue
+        generated += 1
+    return generated
+
+
+# Generate {image id: [filter specs]} and wait for it, returns how many renditions exist.
+# With workers the renditions are made in a process pool forked from this process, only
+# management commands do that, after handing their database connections back. Without
+# workers they are made one after the other in the calling thread
+def generate(renditions, workers=RENDITION_WORKERS):
+    if not renditions:
+        return 0
+    if not workers:
+        return sum(generate_renditions(image_id, specs) for image_id, specs in renditions.items())
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(generate_renditions, list(renditions), list(renditions.values()))
+        return sum(results)
+
+
+# generate the queued renditions batch by batch, returns (renditions ready, images)
+def drain(workers=RENDITION_WORKERS, batch_size=RENDITION_BATCH_SIZE):
+    generated = images = 0
+    while True:
+        rows = list(PendingRendition.objects.order_by('pk').values_list('pk', 'image_id', 'filter_spec')[:batch_size])
+        if not rows:
+            return generated, images
+        renditions = {}
+        for pk, image_id, spec in rows:
+            add_specs(renditions.setdefault(image_id, []), [spec])
+        generated += generate(renditions, workers)
+        images += len(renditions)
+        PendingRendition.objects.filter(pk__in=[row[0] for row in rows]).delete()
+
+
+"""
+Small thread pool draining the queue in the web process.
+
+kick() never runs more than RENDITION_THREADS drains at a time however many
+pages are published, everything else waits in the queue for a running
+drain, a later kick or the prewarm_renditions command. The threads only
+use and close their own database connections.
+"""
+_executor = None
+_running = threading.BoundedSemaphore(RENDITION_THREADS)
+
+
+def _drain_in_thread():
+    try:
+        drain(workers=0)
+    finally:
+        connection.close()
+        _running.release()
+
+
+def kick():
+    global _executor
+    if not _running.acquire(blocking=False):
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=RENDITION_THREADS)
+    _executor.submit(_drain_in_thread)
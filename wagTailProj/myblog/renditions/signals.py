@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from wagtail.core.signals import page_published
+from wagtail.images import get_image_model
+
+from renditions.prewarm import enqueue
+from renditions.specs import all_specs, page_renditions
+
+Image = get_image_model()
+
+
+@receiver(page_published)
+def queue_page_renditions(sender, instance, **kwargs):
+    enqueue(page_renditions(instance))
+
+
+# file the image had before this save, so editing only the title or tags queues nothing
+@receiver(pre_save, sender=Image)
+def remember_file(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_file = sender.objects.filter(pk=instance.pk).values_list('file', flat=True).first()
+
+
+@receiver(post_save, sender=Image)
+def queue_image_renditions(sender, instance, created, **kwargs):
+    if created or instance.file.name != getattr(instance, '_previous_file', None):
+        enqueue({instance.pk: all_specs()})
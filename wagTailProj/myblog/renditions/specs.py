@@ -0,0 +1,104 @@
+import re
+
+from django.conf import settings
+from wagtail.images.models import Filter
+
+# Image fields of pages, or "related_name.field" for images of inline models, and the filter
+# specs our templates render them at, e.g. {'primary_image': ['width-800']}
+RENDITION_SPECS = getattr(settings, 'RENDITION_SPECS', {})
+
+# Sizes every spec is rendered at for srcset, relative to the size the template asks for
+RESPONSIVE_IMAGE_SCALES = getattr(settings, 'RESPONSIVE_IMAGE_SCALES', [1, 1.5, 2])
+# Extra formats offered through <picture>, format-webp needs Wagtail 2.8 or newer
+RESPONSIVE_IMAGE_FORMATS = getattr(settings, 'RESPONSIVE_IMAGE_FORMATS', [])
+
+SIZE_OPERATION_RE = re.compile(r'^(fill|max|min|width|height)-(\d+(?:x\d+)?)(.*)$')
+
+
+def add_specs(specs, new_specs):
+    for spec in new_specs:
+        if spec not in specs:
+            specs.append(spec)
+    return specs
+
+
+def scale_spec(spec, scale):
+    operations = spec.split('|')
+    match = SIZE_OPERATION_RE.match(operations[0])
+    if not match or scale == 1:
+        return spec
+    name, size, options = match.groups()
+    size = 'x'.join(str(int(round(int(n) * scale))) for n in size.split('x'))
+    operations[0] = '%s-%s%s' % (name, size, options)
+    return '|'.join(operations)
+
+
+def format_spec(spec, image_format):
+    return '%s|format-%s' % (spec, image_format) if image_format else spec
+
+
+# {format: [specs]} rendered for spec, None is the original format
+def responsive_specs(spec):
+    specs = {}
+    for image_format in [None] + list(RESPONSIVE_IMAGE_FORMATS):
+        specs[image_format] = add_specs([], [format_spec(scale_spec(spec, scale), image_format)
+                                             for scale in RESPONSIVE_IMAGE_SCALES])
+    return specs
+
+
+def expand_specs(specs):
+    expanded = []
+    for spec in specs:
+        for format_specs in responsive_specs(spec).values():
+            add_specs(expanded, format_specs)
+    return expanded
+
+
+# every spec of RENDITION_SPECS, what a newly uploaded image may be shown at
+def all_specs():
+    specs = []
+    for field_specs in RENDITION_SPECS.values():
+        add_specs(specs, expand_specs(field_specs))
+    return specs
+
+
+# ids of the images a page shows in the field named by path
+def image_ids(page, path):
+    if '.' not in path:
+        image_id = getattr(page, path + '_id', None)
+        return [image_id] if image_id else []
+    related_name, field = path.split('.', 1)
+    if not hasattr(page, related_name):
+        return []
+    items = getattr(page, related_name).all()
+    return [getattr(item, field + '_id') for item in items if getattr(item, field + '_id')]
+
+
+# {image id: [filter specs]} for the images shown on page
+def page_renditions(page):
+    renditions = {}
+    for path, specs in RENDITION_SPECS.items():
+        for image_id in image_ids(page, path):
+            add_specs(renditions.setdefault(image_id, []), expand_specs(specs))
+    return renditions
+
+
+# {spec: rendition} for image in a single query, or none at all when the
+# renditions were prefetched into image.prefetched_renditions
+def get_renditions(image, specs):
+    if hasattr(image, 'prefetched_renditions'):
+        existing = image.prefetched_renditions
+    else:
+        existing = image.renditions.filter(filter_spec__in=specs)
+    existing = {(rendition.filter_spec, rendition.focal_point_key): rendition for rendition in existing}
+    renditions = {}
+    for spec in specs:
+        image_filter = Filter(spec=spec)
+        rendition = existing.get((spec, image_filter.get_cache_key(image)))
+        if rendition is None:
+            try:
+                rendition = image.get_rendition(image_filter)
+            except IOError:
+                continue
+        renditions[spec] = rendition
+    return renditions
@@ -0,0 +1,40 @@
+from django.template import Library
+from django.utils.html import format_html, format_html_join
+
+from renditions.specs import expand_specs, get_renditions, responsive_specs
+
+register = Library()
+
+
+def srcset(renditions):
+    widths = {}
+    for rendition in renditions:
+        widths.setdefault(rendition.width, rendition.url)
+    return ', '.join('%s %dw' % (url, width) for width, url in sorted(widths.items()))
+
+
+# {% responsive_image page.primary_image "width-800" class="hero" %}
+# renders the spec as <img> with a srcset of RESPONSIVE_IMAGE_SCALES, wrapped in
+# <picture> with one <source> per RESPONSIVE_IMAGE_FORMATS. All renditions of the
+# image are looked up in one query
+@register.simple_tag
+def responsive_image(image, spec, sizes=None, **attrs):
+    if not image:
+        return ''
+    specs = responsive_specs(spec)
+    renditions = get_renditions(image, expand_specs([spec]))
+    rendition = renditions.get(spec)
+    if rendition is None:
+        return ''
+
+    attrs['srcset'] = srcset(renditions[s] for s in specs.pop(None) if s in renditions)
+    attrs['sizes'] = sizes or '%dpx' % rendition.width
+    img = rendition.img_tag(attrs)
+    if not specs:
+        return img
+
+    sources = format_html_join('', '<source type="image/{}" srcset="{}" sizes="{}">', (
+        (image_format, srcset(renditions[s] for s in format_specs if s in renditions), attrs['sizes'])
+        for image_format, format_specs in specs.items()
+    ))
+    return format_html('<picture>{}{}</picture>', sources, img)
@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+
+from renditions.models import PendingRendition
+from renditions.prewarm import drain
+from renditions.specs import expand_specs, page_renditions, scale_spec
+
+
+class SpecTests(SimpleTestCase):
+
+    def test_scale_spec(self):
+        self.assertEqual(scale_spec('fill-160x100', 2), 'fill-320x200')
+        self.assertEqual(scale_spec('width-800|jpegquality-60', 1.5), 'width-1200|jpegquality-60')
+        self.assertEqual(scale_spec('original', 2), 'original')
+
+    @mock.patch('renditions.specs.RESPONSIVE_IMAGE_SCALES', [1, 2])
+    @mock.patch('renditions.specs.RESPONSIVE_IMAGE_FORMATS', ['webp'])
+    def test_expand_specs(self):
+        self.assertEqual(expand_specs(['width-800']), [
+            'width-800', 'width-1600', 'width-800|format-webp', 'width-1600|format-webp',
+        ])
+
+    @mock.patch('renditions.specs.RESPONSIVE_IMAGE_SCALES', [1])
+    @mock.patch('renditions.specs.RENDITION_SPECS', {'primary_image': ['width-800'], 'og_image': ['fill-1200x630']})
+    def test_page_renditions(self):
+        page = SimpleNamespace(primary_image_id=3, og_image_id=None)
+        self.assertEqual(page_renditions(page), {3: ['width-800']})
+
+    @mock.patch('renditions.specs.RESPONSIVE_IMAGE_SCALES', [1])
+    @mock.patch('renditions.specs.RENDITION_SPECS', {'gallery_images.image': ['fill-160x100']})
+    def test_page_renditions_of_inline_images(self):
+        items = [SimpleNamespace(image_id=4), SimpleNamespace(image_id=None)]
+        page = SimpleNamespace(gallery_images=SimpleNamespace(all=lambda: items))
+        self.assertEqual(page_renditions(page), {4: ['fill-160x100']})
+        self.assertEqual(page_renditions(SimpleNamespace()), {})
+
+
+class QueueTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    @mock.patch('renditions.signals.all_specs', lambda: ['width-800'])
+    def test_only_new_files_are_queued(self):
+        image = get_image_model().objects.create(title='Test', file=get_test_image_file())
+        self.assertEqual(list(PendingRendition.objects.values_list('image_id', 'filter_spec')), [(image.pk, 'width-800')])
+
+        image.title = 'Renamed'
+        image.save()
+        self.assertEqual(PendingRendition.objects.count(), 1)
+
+        image.file = get_test_image_file(filename='other.png')
+        image.save()
+        self.assertEqual(PendingRendition.objects.count(), 2)
+
+    def test_drain_generates_in_this_process(self):
+        with mock.patch('renditions.signals.all_specs', lambda: ['width-10']):
+            image = get_image_model().objects.create(title='Test', file=get_test_image_file())
+
+        self.assertEqual(drain(workers=0), (1, 1))
+        self.assertTrue(image.renditions.filter(filter_spec='width-10').exists())
+        self.assertFalse(PendingRendition.objects.exists())
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    name = 'search'
+
+    def ready(self):
+        from search import signals  # noqa
@@ -0,0 +1,137 @@
+import bisect
+import threading
+import uuid
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from wagtail.core.models import Page, Site
+
+AUTOCOMPLETE_LIMIT = getattr(settings, 'AUTOCOMPLETE_LIMIT', 10)
+
+VERSION_KEY = 'search:autocomplete:version'
+
+# a misspelt term still matches when this share of its trigrams is found
+TRIGRAM_THRESHOLD = 0.4
+
+
+def normalise(value):
+    return ' '.join(value.lower().split())
+
+
+def trigrams(term):
+    term = '  %s ' % term
+    return set(term[i:i + 3] for i in range(len(term) - 2))
+
+
+# page url relative to the site holding it
+def page_url(url_path, root_paths):
+    for site_id, root_path, root_url in root_paths:
+        if url_path.startswith(root_path):
+            return '/' + url_path[len(root_path):]
+    return None
+
+
+# the version changes whenever a page, tag or category does, every process rebuilds its index
+# on its next query once the shared version differs from the one it was built for
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+"""
+In-memory suggestion index of page titles, tag names and category names.
+
+Terms are kept in a sorted list for prefix lookups with bisect, and every
+term is also split into trigrams so a typo in the last term still finds
+suggestions. The index is built from live public pages only and is rebuilt
+as a whole when the version shared through the Django cache changes, so
+every worker process drops changed or newly private pages, not only the one
+receiving the signal.
+"""
+class AutocompleteIndex(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.entries = {}
+        self.terms = []
+        self.trigrams = {}
+
+    def build(self):
+        version = get_version()
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            self.entries, self.terms, self.trigrams = {}, [], {}
+            root_paths = Site.get_site_root_paths()
+            for page in Page.objects.live().public().exclude(depth=1).values('id', 'title', 'url_path').iterator():
+                self._add(('page', page['id']), page['title'], page_url(page['url_path'], root_paths))
+            for kind, model_name in (('tag', 'taggit.Tag'), ('category', 'blog.BlogCatagory')):
+                for pk, name in apps.get_model(model_name).objects.values_list('pk', 'name').iterator():
+                    self._add((kind, pk), name, None)
+            self.terms.sort()
+            self.version = version
+
+    def _add(self, key, label, url):
+        self.entries[key] = {'label': label, 'type': key[0], 'url': url}
+        for term in set(normalise(label).split()):
+            self.terms.append((term, key))
+            for trigram in trigrams(term):
+                self.trigrams.setdefault(trigram, set()).add((term, key))
+
+    def invalidate(self):
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+    def _prefix_matches(self, prefix):
+        position = bisect.bisect_left(self.terms, (prefix,))
+        while position < len(self.terms) and self.terms[position][0].startswith(prefix):
+            yield self.terms[position][1]
+            position += 1
+
+    def _fuzzy_matches(self, term):
+        wanted = trigrams(term)
+        found = Counter()
+        for trigram in wanted:
+            for match in self.trigrams.get(trigram, ()):
+                found[match] += 1
+        scored = sorted(
+            (count / float(len(wanted | trigrams(match[0]))), match[1])
+            for match, count in found.items()
+        )
+        return [key for score, key in reversed(scored) if score >= TRIGRAM_THRESHOLD]
+
+    # earlier words of the query must prefix a word of the label, the last word may be unfinished or misspelt
+    def query(self, query_string, limit=AUTOCOMPLETE_LIMIT):
+        self.build()
+        words = normalise(query_string).split()
+        if not words:
+            return []
+
+        with self.lock:
+            keys = list(self._prefix_matches(words[-1]))
+            if len(keys) < limit and len(words[-1]) >= 3:
+                keys += self._fuzzy_matches(words[-1])
+
+            results = []
+            seen = set()
+            for key in keys:
+                if key in seen or key not in self.entries:
+                    continue
+                seen.add(key)
+                entry = self.entries[key]
+                label_words = normalise(entry['label']).split()
+                if all(any(label_word.startswith(word) for label_word in label_words) for word in words[:-1]):
+                    results.append(entry)
+                if len(results) >= limit:
+                    break
+        return results
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,68 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+SEARCH_CACHE_SIZE = getattr(settings, 'SEARCH_CACHE_SIZE', 1000)
+SEARCH_CACHE_TIMEOUT = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 60 * 5)
+
+GENERATION_KEY = 'search:generation'
+
+
+# the generation changes whenever the search index does, entries of an older generation are dropped
+# in every process as it is read from the shared cache on each lookup
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def invalidate():
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+"""In-process LRU cache of search results with a TTL.
+
+Entries only hold result page ids and the total count, and are tied to the
+current search generation. The generation is kept in the default cache,
+which must be shared by every worker process (see CACHES in settings): a
+publish in one process is then seen by the others on their next lookup.
+With a per process cache it would only drop the entries of that process
+and the others would serve stale results until the TTL runs out.
+"""
+class ResultCache(object):
+
+    def __init__(self, size=SEARCH_CACHE_SIZE, timeout=SEARCH_CACHE_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        generation = get_generation()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, entry_generation, expires = entry
+            if entry_generation != generation or expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        entry = (value, get_generation(), time.time() + self.timeout)
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+result_cache = ResultCache()
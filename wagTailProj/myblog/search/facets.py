@@ -0,0 +1,78 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count
+from wagtail.search.utils import normalise_query_string
+
+from blog.models import PostPage
+from search.cache import SEARCH_CACHE_TIMEOUT, get_generation
+
+# facet name and the query string parameter selecting a value of it
+FACETS = ('category', 'tag', 'year')
+
+# lookup of the value and of its label for every facet, a facet without a label shows its value
+FACET_FIELDS = {
+    'category': ('categories__slug', 'categories__name'),
+    'tag': ('tags__slug', 'tags__name'),
+    'year': ('archive_entry__year', None),
+}
+
+
+# Live posts matching the query as a queryset, so facets are filtered and counted by the database.
+# The database backend and sqlitefts match inside the database and give it with get_queryset(),
+# it is query_compiler.queryset narrowed to the matches. Only backends matching outside the
+# database (e.g. Elasticsearch) fall back to the matched ids, in id order
+def matched_posts(search_query, order_by_relevance=False):
+    results = PostPage.objects.live().search(search_query, order_by_relevance=order_by_relevance)
+    get_queryset = getattr(results, 'get_queryset', None)
+    if get_queryset is not None:
+        return get_queryset()
+    return PostPage.objects.filter(pk__in=[post.pk for post in results])
+
+
+# posts narrowed to the selected facet values, selected is {facet: value}. Each value is
+# matched in a subquery so the joins counting the facets still see every tag or category of a post
+def filter_posts(posts, selected):
+    for facet, value in selected.items():
+        if facet == 'year' and not value.isdigit():
+            return posts.none()
+        posts = posts.filter(pk__in=PostPage.objects.filter(**{FACET_FIELDS[facet][0]: value}).values('pk'))
+    return posts
+
+
+# {facet: [(value, label, count)]} over the given posts with one grouped query per facet, biggest count first
+def count_facets(posts):
+    counts = {}
+    for facet in FACETS:
+        value_field, label_field = FACET_FIELDS[facet]
+        fields = [value_field, label_field or value_field]
+        rows = (
+            posts.order_by()
+            .filter(**{value_field + '__isnull': False})
+            .values(*set(fields))
+            .annotate(count=Count('pk', distinct=True))
+        )
+        values = [(str(row[fields[0]]), str(row[fields[1]]), row['count']) for row in rows]
+        values.sort(key=lambda value: (-value[2], value[1]))
+        counts[facet] = values
+    return counts
+
+
+"""
+Facet counts of a search, narrowed by the selected facet values.
+
+Counts are computed by the database over the matched posts and cached in
+the shared cache under the current search generation (see search/cache.py),
+so they are dropped in every process when posts, tags or categories change.
+"""
+def facet_counts(search_query, selected):
+    key = 'search:facets:%s' % hashlib.sha1(repr([
+        get_generation(),
+        normalise_query_string(search_query),
+        sorted(selected.items()),
+    ]).encode()).hexdigest()
+    counts = cache.get(key)
+    if counts is None:
+        counts = count_facets(filter_posts(matched_posts(search_query), selected))
+        cache.set(key, counts, SEARCH_CACHE_TIMEOUT)
+    return counts
@@ -0,0 +1,157 @@
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from wagtail.search.models import Query, QueryDailyHits
+from wagtail.search.utils import normalise_query_string
+
+SEARCH_HITS_FLUSH_SIZE = getattr(settings, 'SEARCH_HITS_FLUSH_SIZE', 100)
+SEARCH_HITS_FLUSH_INTERVAL = getattr(settings, 'SEARCH_HITS_FLUSH_INTERVAL', 60)
+SEARCH_HITS_ATTEMPTS = getattr(settings, 'SEARCH_HITS_ATTEMPTS', 3)
+SEARCH_HITS_SPOOL_DIR = getattr(settings, 'SEARCH_HITS_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'search_hits'))
+
+
+def _save_hits(counts):
+    strings = set(query_string for query_string, date in counts)
+    queries = dict(Query.objects.filter(query_string__in=strings).values_list('query_string', 'id'))
+    missing = strings - set(queries)
+    if missing:
+        Query.objects.bulk_create([Query(query_string=query_string) for query_string in missing])
+        queries.update(Query.objects.filter(query_string__in=missing).values_list('query_string', 'id'))
+
+    dates = set(date for query_string, date in counts)
+    existing = {
+        (query_id, date): pk for pk, query_id, date in QueryDailyHits.objects.filter(
+            query_id__in=queries.values(), date__in=dates
+        ).values_list('pk', 'query_id', 'date')
+    }
+
+    increments = []
+    new_hits = []
+    for (query_string, date), hits in counts.items():
+        query_id = queries[query_string]
+        if (query_id, date) in existing:
+            increments.append(When(pk=existing[(query_id, date)], then=Value(hits)))
+        else:
+            new_hits.append(QueryDailyHits(query_id=query_id, date=date, hits=hits))
+    if increments:
+        QueryDailyHits.objects.filter(pk__in=existing.values()).update(
+            hits=F('hits') + Case(*increments, default=Value(0), output_field=IntegerField())
+        )
+    QueryDailyHits.objects.bulk_create(new_hits)
+
+
+# write aggregated {(query_string, date): hits} counts with a handful of queries: existing rows are
+# incremented by a single UPDATE and missing ones are inserted in bulk. A query or daily row inserted
+# by another process in between makes the insert fail, the whole write is then rolled back and
+# retried, finding that row and incrementing it
+def save_hits(counts, attempts=SEARCH_HITS_ATTEMPTS):
+    for attempt in range(1, attempts + 1):
+        try:
+            with transaction.atomic():
+                return _save_hits(counts)
+        except IntegrityError:
+            if attempt == attempts:
+                raise
+
+
+# counts that could not be written are kept on disk until flush_search_hits picks them up
+def spool_hits(counts):
+    os.makedirs(SEARCH_HITS_SPOOL_DIR, exist_ok=True)
+    name = os.path.join(SEARCH_HITS_SPOOL_DIR, 'hits-%s-%s.json' % (os.getpid(), time.time()))
+    with open(name, 'w') as f:
+        json.dump([[query_string, date.isoformat(), hits] for (query_string, date), hits in counts.items()], f)
+
+
+# spool files are claimed by renaming them, so processes draining at the same time never write one twice
+def drain_spool():
+    drained = 0
+    for name in sorted(glob.glob(os.path.join(SEARCH_HITS_SPOOL_DIR, 'hits-*.json'))):
+        claimed = '%s.%s' % (name, os.getpid())
+        try:
+            os.rename(name, claimed)
+        except OSError:
+            continue
+        with open(claimed) as f:
+            counts = Counter({(query_string, parse_date(date)): hits for query_string, date, hits in json.load(f)})
+        try:
+            save_hits(counts)
+        except DatabaseError:
+            os.rename(claimed, name)
+            raise
+        os.remove(claimed)
+        drained += sum(counts.values())
+    return drained
+
+
+"""
+In-process buffer of search hits.
+
+Requests only bump a counter, the buffer is written to the wagtailsearch
+tables in bulk once it holds SEARCH_HITS_FLUSH_SIZE hits, by a timer
+SEARCH_HITS_FLUSH_INTERVAL seconds after the first buffered hit, and when
+the process exits. Hits that can't be written are spooled to disk and
+written by the next timed flush or by the flush_search_hits command.
+"""
+class HitBuffer(object):
+
+    def __init__(self, size=SEARCH_HITS_FLUSH_SIZE, interval=SEARCH_HITS_FLUSH_INTERVAL):
+        self.size = size
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.timer = None
+
+    def add(self, query_string):
+        query_string = normalise_query_string(query_string)[:255]
+        if not query_string:
+            return
+
+        with self.lock:
+            self.counts[(query_string, timezone.localdate())] += 1
+            due = sum(self.counts.values()) >= self.size
+            if not due and self.timer is None:
+                self.timer = threading.Timer(self.interval, self.timed_flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not counts:
+            return 0
+
+        try:
+            save_hits(counts)
+        except DatabaseError:
+            spool_hits(counts)
+        return sum(counts.values())
+
+    # runs in the timer thread, which owns its own database connection
+    def timed_flush(self):
+        try:
+            self.flush()
+            drain_spool()
+        except DatabaseError:
+            pass
+        finally:
+            connections.close_all()
+
+
+hit_buffer = HitBuffer()
+atexit.register(hit_buffer.flush)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from search.hits import drain_spool, hit_buffer
+
+
+class Command(BaseCommand):
+    help = 'Write buffered and spooled search hits to the search query tables'
+
+    def handle(self, *args, **options):
+        count = hit_buffer.flush() + drain_spool()
+        self.stdout.write('Recorded %d search hits' % count)
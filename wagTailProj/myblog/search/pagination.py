@@ -0,0 +1,66 @@
+from django.conf import settings
+
+# 'exact' counts every match like django's Paginator, 'cheap' only fetches one result past the page
+SEARCH_PAGINATION = getattr(settings, 'SEARCH_PAGINATION', 'cheap')
+
+
+def page_number(page):
+    try:
+        return max(int(page), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+"""A page of search results with the interface of django's paginator Page.
+
+count is the total number of results when it is known and None otherwise.
+"""
+class SearchResultsPage(object):
+
+    def __init__(self, object_list, number, has_next, count=None):
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+# fetch per_page + 1 results to know whether there is a next page, without counting all matches.
+# count is the total when it is already known, otherwise it is only known once the last page is
+# reached. A page past the end counts the results once and shows the last page, like get_page
+def cheap_page(results, page, per_page, count=None):
+    number = page_number(page)
+    offset = (number - 1) * per_page
+    rows = list(results[offset:offset + per_page + 1]) if count is None or offset < count else []
+    if not rows and number > 1:
+        if count is None:
+            count = results.count()
+        number = max(-(-count // per_page), 1)
+        offset = (number - 1) * per_page
+        rows = list(results[offset:offset + per_page + 1])
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    if count is None and not has_next:
+        count = offset + len(rows)
+    return SearchResultsPage(rows, number, has_next, count)
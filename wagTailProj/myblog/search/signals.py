@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from taggit.models import Tag as TaggitTag
+from wagtail.core.models import Page, PageViewRestriction
+from wagtail.core.signals import page_published, page_unpublished
+
+from blog.models import BlogCatagory, Tag
+from search.autocomplete import autocomplete_index
+from search.cache import invalidate
+
+
+# the autocomplete index is rebuilt from live public pages, so changed titles, unpublished
+# pages and pages put behind a view restriction are dropped by every process
+@receiver(page_published)
+@receiver(page_unpublished)
+@receiver(post_delete, sender=Page)
+def page_changed(sender, instance, **kwargs):
+    invalidate()
+    autocomplete_index.invalidate()
+
+
+@receiver(post_save, sender=PageViewRestriction)
+@receiver(post_delete, sender=PageViewRestriction)
+def view_restriction_changed(sender, instance, **kwargs):
+    invalidate()
+    autocomplete_index.invalidate()
+
+
+# facet labels and counts are cached under the search generation
+def tag_changed(sender, instance, **kwargs):
+    invalidate()
+    autocomplete_index.invalidate()
+
+
+for tag_model in (TaggitTag, Tag):
+    post_save.connect(tag_changed, sender=tag_model)
+    post_delete.connect(tag_changed, sender=tag_model)
+
+
+@receiver(post_save, sender=BlogCatagory)
+@receiver(post_delete, sender=BlogCatagory)
+def category_changed(sender, instance, **kwargs):
+    invalidate()
+    autocomplete_index.invalidate()
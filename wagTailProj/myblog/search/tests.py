@@ -0,0 +1,139 @@
+import datetime
+
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from wagtail.core.models import Page, PageViewRestriction
+from wagtail.search.models import QueryDailyHits
+
+from blog.models import BlogCatagory, BlogPage, PostPage
+from search.autocomplete import AutocompleteIndex
+from search.facets import count_facets, filter_posts, matched_posts
+from search.hits import save_hits
+from search.pagination import cheap_page
+
+
+def make_page(title, slug):
+    root = Page.objects.get(depth=1)
+    return root.add_child(instance=Page(title=title, slug=slug))
+
+
+def labels(results):
+    return [result['label'] for result in results]
+
+
+class AutocompleteTests(TestCase):
+
+    def test_private_pages_are_not_suggested(self):
+        make_page('Zebra public', 'zebra-public')
+        private = make_page('Zebra private', 'zebra-private')
+        PageViewRestriction.objects.create(page=private, restriction_type='password', password='secret')
+
+        self.assertEqual(labels(AutocompleteIndex().query('zebra')), ['Zebra public'])
+
+    def test_index_is_rebuilt_when_the_shared_version_changes(self):
+        index = AutocompleteIndex()
+        self.assertEqual(index.query('zebra'), [])
+
+        make_page('Zebra crossing', 'zebra-crossing')
+        self.assertEqual(index.query('zebra'), [])
+
+        # another process bumping the version is seen through the cache
+        AutocompleteIndex().invalidate()
+        self.assertEqual(labels(index.query('zebra')), ['Zebra crossing'])
+
+    def test_misspelt_last_word(self):
+        make_page('Elephant stories', 'elephant-stories')
+        self.assertEqual(labels(AutocompleteIndex().query('elefant')), ['Elephant stories'])
+
+
+class FacetTests(TestCase):
+
+    def setUp(self):
+        root = Page.objects.get(depth=1)
+        blog = root.add_child(instance=BlogPage(title='Blog', slug='blog'))
+        news = BlogCatagory.objects.create(name='News', slug='news')
+        for slug, year, tags in (('one', 2017, ['django']), ('two', 2018, ['django', 'wagtail']), ('three', 2018, [])):
+            post = blog.add_child(instance=PostPage(
+                title=slug, slug=slug, date=timezone.make_aware(datetime.datetime(year, 6, 1))
+            ))
+            post.tags.add(*tags)
+            post.categories.add(news)
+            post.save_revision().publish()
+
+    def test_counts_are_grouped_in_the_database(self):
+        with self.assertNumQueries(3):
+            counts = count_facets(PostPage.objects.live())
+        self.assertEqual(counts['tag'], [('django', 'django', 2), ('wagtail', 'wagtail', 1)])
+        self.assertEqual(counts['category'], [('news', 'News', 3)])
+        self.assertEqual(counts['year'], [('2018', '2018', 2), ('2017', '2017', 1)])
+
+    def test_selected_values_narrow_the_counts(self):
+        counts = count_facets(filter_posts(PostPage.objects.live(), {'year': '2018', 'tag': 'django'}))
+        self.assertEqual(counts['tag'], [('django', 'django', 1), ('wagtail', 'wagtail', 1)])
+        self.assertEqual(counts['year'], [('2018', '2018', 1)])
+
+    def test_matches_are_a_queryset_with_either_backend(self):
+        for backend in ('sqlitefts.backends', 'wagtail.search.backends.db'):
+            with override_settings(WAGTAILSEARCH_BACKENDS={'default': {'BACKEND': backend}}):
+                posts = matched_posts('two')
+                self.assertIsInstance(posts, QuerySet)
+                self.assertEqual([post.slug for post in posts], ['two'])
+                self.assertEqual(count_facets(posts)['year'], [('2018', '2018', 1)])
+
+    def test_invalid_year_matches_nothing(self):
+        self.assertFalse(filter_posts(PostPage.objects.live(), {'year': 'x'}).exists())
+
+
+class Results(list):
+
+    def count(self):
+        self.counted = True
+        return len(self)
+
+
+class CheapPaginationTests(SimpleTestCase):
+
+    def setUp(self):
+        self.results = Results(range(25))
+
+    def test_middle_page_has_no_count(self):
+        page = cheap_page(self.results, '2', 10)
+        self.assertEqual(list(page), list(range(10, 20)))
+        self.assertTrue(page.has_next())
+        self.assertIsNone(page.count)
+
+    def test_last_page_knows_the_count(self):
+        page = cheap_page(self.results, 3, 10)
+        self.assertEqual(list(page), list(range(20, 25)))
+        self.assertFalse(page.has_next())
+        self.assertEqual(page.count, 25)
+
+    def test_page_past_the_end_shows_the_last_page(self):
+        page = cheap_page(self.results, 9, 10)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(list(page), list(range(20, 25)))
+        self.assertEqual(page.count, 25)
+
+    def test_known_count_is_used(self):
+        page = cheap_page(self.results, 9, 10, count=25)
+        self.assertEqual(page.number, 3)
+        self.assertFalse(hasattr(self.results, 'counted'))
+        page = cheap_page(self.results, 1, 10, count=25)
+        self.assertEqual(page.count, 25)
+
+    def test_invalid_page_is_the_first(self):
+        self.assertEqual(cheap_page(self.results, 'x', 10).number, 1)
+        self.assertEqual(cheap_page(Results(), 2, 10).number, 1)
+
+
+class SaveHitsTests(TestCase):
+
+    def hits(self):
+        return dict(QueryDailyHits.objects.values_list('query__query_string', 'hits'))
+
+    def test_existing_rows_are_incremented_and_new_ones_inserted(self):
+        today = datetime.date(2018, 6, 1)
+        save_hits({('django', today): 2})
+        save_hits({('django', today): 3, ('wagtail', today): 1})
+        self.assertEqual(self.hits(), {'django': 5, 'wagtail': 1})
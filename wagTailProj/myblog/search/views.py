@@ -1,34 +1,134 @@
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.http import JsonResponse
 from django.shortcuts import render
 
 from wagtail.core.models import Page
-from wagtail.search.models import Query
+from wagtail.search.utils import normalise_query_string
+
+from search.autocomplete import autocomplete_index
+from search.cache import result_cache
+from search.facets import FACETS, facet_counts, filter_posts, matched_posts
+from search.hits import hit_buffer
+from search.pagination import SEARCH_PAGINATION, SearchResultsPage, cheap_page
+
+RESULTS_PER_PAGE = 10
+
+
+def get_page(paginator, page):
+    try:
+        return paginator.page(page)
+    except PageNotAnInteger:
+        return paginator.page(1)
+    except EmptyPage:
+        return paginator.page(paginator.num_pages)
+
+
+# load result pages by id keeping the order of the ids
+def load_pages(ids):
+    pages = Page.objects.in_bulk(ids)
+    return [pages[pk] for pk in ids if pk in pages]
+
+
+# The total number of results is cached per query once it is known (the exact paginator, the last
+# page or a page past the end), so later pages of the same query show it without a COUNT
+def search_results_page(request, search_query, page):
+    site = getattr(request, 'site', None)
+    query = normalise_query_string(search_query)
+    key = (query, site.pk if site else None, page)
+    count_key = ('count', query, site.pk if site else None)
+    cached = result_cache.get(key)
+
+    if cached is None:
+        search_results = Page.objects.live().search(search_query)
+        if SEARCH_PAGINATION == 'exact':
+            paginator = Paginator(search_results, RESULTS_PER_PAGE)
+            django_page = get_page(paginator, page)
+            search_results = SearchResultsPage(
+                list(django_page), django_page.number, django_page.has_next(), paginator.count
+            )
+        else:
+            search_results = cheap_page(search_results, page, RESULTS_PER_PAGE, result_cache.get(count_key))
+
+        if search_results.count is not None:
+            result_cache.set(count_key, search_results.count)
+        result_cache.set(key, (
+            [result.pk for result in search_results],
+            search_results.count,
+            search_results.number,
+            search_results.has_next(),
+        ))
+        return search_results
+
+    # cached page: only the result pages themselves are loaded, no search backend and no count
+    ids, count, number, has_next = cached
+    if count is None:
+        count = result_cache.get(count_key)
+    return SearchResultsPage(load_pages(ids), number, has_next, count)
+
+
+# facet values with counts over the matched posts and links selecting or clearing each value
+def get_facets(request, search_query, selected):
+    facets = []
+    counts = facet_counts(search_query, selected)
+    for facet in FACETS:
+        values = counts[facet]
+        links = []
+        for value, label, count in values:
+            params = request.GET.copy()
+            params.pop('page', None)
+            if selected.get(facet) == value:
+                params.pop(facet, None)
+            else:
+                params[facet] = value
+            links.append({
+                'value': value,
+                'label': label,
+                'count': count,
+                'selected': selected.get(facet) == value,
+                'url': '?' + params.urlencode(),
+            })
+        if links:
+            facets.append({'name': facet, 'values': links})
+    return facets
 
 
 def search(request):
     search_query = request.GET.get('query', None)
     page = request.GET.get('page', 1)
+    facets = []
 
     # Search
     if search_query:
-        search_results = Page.objects.live().search(search_query)
-        query = Query.get(search_query)
+        selected = {facet: request.GET[facet] for facet in FACETS if request.GET.get(facet)}
+        facets = get_facets(request, search_query, selected)
 
-        # Record hit
-        query.add_hit()
+        if selected:
+            # narrowed by facets: results are the matched posts left, in rank order
+            posts = filter_posts(matched_posts(search_query, order_by_relevance=True), selected)
+            paginator = Paginator(posts, RESULTS_PER_PAGE)
+            django_page = get_page(paginator, page)
+            search_results = SearchResultsPage(
+                list(django_page), django_page.number, django_page.has_next(), paginator.count
+            )
+        else:
+            search_results = search_results_page(request, search_query, page)
+
+        # Record hit, written in bulk by the hit buffer
+        hit_buffer.add(search_query)
     else:
-        search_results = Page.objects.none()
+        search_results = SearchResultsPage([], 1, False, 0)
 
-    # Pagination
-    paginator = Paginator(search_results, 10)
-    try:
-        search_results = paginator.page(page)
-    except PageNotAnInteger:
-        search_results = paginator.page(1)
-    except EmptyPage:
-        search_results = paginator.page(paginator.num_pages)
+    params = request.GET.copy()
+    params.pop('page', None)
 
     return render(request, 'search/search.html', {
         'search_query': search_query,
         'search_results': search_results,
+        'search_params': params.urlencode(),
+        'facets': facets,
     })
+
+
+# suggestions for the search box, served from the in-memory autocomplete index
+def autocomplete(request):
+    return JsonResponse({'results': autocomplete_index.query(request.GET.get('q', ''))})
@@ -0,0 +1 @@
+"""SQLite FTS5 search backend, see sqlitefts/backends.py."""
@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from wagtail.core.models import Page
+
+from sqlitefts.backends import SQLiteFTSIndex, SQLiteFTSSearchBackend, build_match
+
+
+class BuildMatchTests(SimpleTestCase):
+
+    def test_every_term_is_quoted(self):
+        self.assertEqual(build_match('foo" OR bar*'), '"foo"* OR "OR"* OR "bar"*')
+        self.assertEqual(build_match('title:foo NEAR(a b)'), '"title"* OR "foo"* OR "NEAR"* OR "a"* OR "b"*')
+
+    def test_options(self):
+        self.assertEqual(build_match('foo bar', operator='and', partial_match=False), '"foo" AND "bar"')
+        self.assertEqual(build_match('foo', title_only=True), 'title : ("foo"*)')
+
+    def test_query_without_terms(self):
+        self.assertIsNone(build_match('"*( -'))
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        root = Page.objects.get(depth=1)
+        self.animals = root.add_child(instance=Page(title='Animals', slug='animals'))
+        self.zebra = root.add_child(instance=Page(title='Zebra', slug='zebra'))
+        # bm25 only weighs terms that are in less than half of the rows
+        others = [root.add_child(instance=Page(title='Other', slug='other-%d' % number)) for number in range(3)]
+        self.backend = SQLiteFTSSearchBackend({})
+        documents = {page.pk: ('Other', 'nothing to see') for page in others}
+        documents[self.animals.pk] = ('Animals', 'a zebra, a lion and a zebra foal')
+        documents[self.zebra.pk] = ('Zebra', 'stripes')
+        with mock.patch.object(SQLiteFTSIndex, 'get_document', lambda index, obj: documents[obj.pk]):
+            self.backend.add_bulk(Page, [self.animals, self.zebra] + others)
+
+    def search(self, query_string, **kwargs):
+        return list(self.backend.search(query_string, Page.objects.all(), **kwargs))
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('zebra'), [self.zebra, self.animals])
+
+    def test_fts_syntax_is_searched_as_text(self):
+        for query_string in ('zebra" OR', 'NEAR(zebra lion)', 'zeb*', 'body:zebra', '-zebra ^'):
+            self.assertIn(self.zebra, self.search(query_string))
+        self.assertEqual(self.search('"*('), [])
+
+    def test_queryset_filters_still_apply(self):
+        results = self.backend.search('zebra', Page.objects.exclude(pk=self.zebra.pk))
+        self.assertEqual(list(results), [self.animals])
+        self.assertEqual(results.count(), 1)
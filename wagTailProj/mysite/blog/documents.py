@@ -0,0 +1,141 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+# 'range' streams from Django with Range support, 'x-accel-redirect' (nginx) and
+# 'x-sendfile' (Apache, lighttpd) hand the file over to the front-end server
+DOCUMENT_SERVE_METHOD = getattr(settings, 'DOCUMENT_SERVE_METHOD', 'range')
+# internal nginx location aliased to MEDIA_ROOT, used with x-accel-redirect
+DOCUMENT_ACCEL_REDIRECT_PREFIX = getattr(settings, 'DOCUMENT_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange(object):
+    """
+    Reads at most length bytes of file starting at offset.
+
+    fileno() is passed through, so a WSGI server's file_wrapper can still
+    sendfile() the range, limited by the response's Content-Length.
+    """
+    def __init__(self, file, offset, length):
+        self.file = file
+        self.remaining = length
+        file.seek(offset)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def content_disposition(filename):
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        return "attachment; filename*=UTF-8''%s" % quote(filename)
+    return 'attachment; filename="%s"' % filename.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def file_etag(stat):
+    return '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+
+
+# (start, end) of a single "bytes=" range, None for a missing or multi range
+# header, which is answered with the whole file, and ValueError when unsatisfiable
+def parse_range(header, size):
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError('Unsatisfiable range %s' % header)
+    return start, end
+
+
+# a Range request is only honoured when If-Range still matches the file
+def if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def accel_redirect_response(name, content_type):
+    response = HttpResponse(content_type=content_type)
+    response['X-Accel-Redirect'] = DOCUMENT_ACCEL_REDIRECT_PREFIX + quote(name.replace(os.sep, '/'))
+    return response
+
+
+def sendfile_response(path, content_type):
+    response = HttpResponse(content_type=content_type)
+    response['X-Sendfile'] = path
+    return response
+
+
+def range_response(request, path, content_type):
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response['ETag'] = etag
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if request.method == 'GET' and 'HTTP_RANGE' in request.META and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % size
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(open(path, 'rb'), start, end - start + 1), content_type=content_type, status=206)
+        response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+        response['Content-Length'] = end - start + 1
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+# Response for a document stored on the local filesystem, in DOCUMENT_SERVE_METHOD
+def serve_file(request, document, path):
+    content_type = mimetypes.guess_type(document.filename)[0] or 'application/octet-stream'
+    if DOCUMENT_SERVE_METHOD == 'x-accel-redirect':
+        response = accel_redirect_response(document.file.name, content_type)
+    elif DOCUMENT_SERVE_METHOD == 'x-sendfile':
+        response = sendfile_response(path, content_type)
+    else:
+        response = range_response(request, path, content_type)
+    response['Content-Disposition'] = content_disposition(document.filename)
+    return response
@@ -1,10 +1,14 @@
 from django.db import models
+from django.db.models import Prefetch
+from django.core.paginator import Paginator
 import json
 
 ## New imports added for imagesField -- ParentalKey, Orderable, InlinePanel, ImageChooserPanel
 from modelcluster.fields import ParentalKey
 from wagtail.core.models import Page, Orderable
 from wagtail.images.edit_handlers import ImageChooserPanel
+from wagtail.images import get_image_model
+from renditions.specs import expand_specs
 from wagtail.admin.edit_handlers import InlinePanel
 
 # New imports added for documentsField -- Document
@@ -27,13 +31,36 @@ from wagtail.core.fields import RichTextField
 from wagtail.admin.edit_handlers import FieldPanel
 from wagtail.search import index
 
+BLOG_INDEX_PAGE_SIZE = 10
+LISTING_IMAGE_FILTER = 'fill-160x100'
+
+
+# Specific BlogPage children of parent, with their gallery images, images and
+# listing renditions fetched in one query each instead of per post
+def listing_posts(parent):
+    Rendition = get_image_model().get_rendition_model()
+    return BlogPage.objects.child_of(parent).live().order_by('-first_published_at').prefetch_related(
+        Prefetch(
+            'gallery_images',
+            queryset=BlogPageGalleryImage.objects.select_related('image'),
+            to_attr='listing_gallery_images',
+        ),
+        Prefetch(
+            'listing_gallery_images__image__renditions',
+            queryset=Rendition.objects.filter(filter_spec__in=expand_specs([LISTING_IMAGE_FILTER])),
+            to_attr='prefetched_renditions',
+        ),
+    )
+
+
 class BlogIndexPage(Page):
     intro = RichTextField(blank=True)
     
     def get_context(self, request):
         # Update context to include only published posts, ordered by reverse-chron
         context     = super().get_context(request)
-        blogpages = self.get_children().live().order_by('-first_published_at')
+        paginator = Paginator(listing_posts(self), BLOG_INDEX_PAGE_SIZE)
+        blogpages = paginator.get_page(request.GET.get('page'))
         context['blogpages'] = blogpages
         return context
 
@@ -52,7 +79,10 @@ class BlogPage(Page):
 
     # for returning image from first gallery
     def main_image(self):
-        gallery_item = self.gallery_images.first()
+        if hasattr(self, 'listing_gallery_images'):
+            gallery_item = self.listing_gallery_images[0] if self.listing_gallery_images else None
+        else:
+            gallery_item = self.gallery_images.first()
         if gallery_item:
             return gallery_item.image
         else:
@@ -1,3 +1,85 @@
-from django.test import TestCase
+import os
+import tempfile
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.http import http_date
+
+from blog.documents import file_etag, parse_range, range_response
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_ranges(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_unsupported_ranges_serve_the_whole_file(self):
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range('bytes=-', 100))
+        self.assertIsNone(parse_range('items=0-1', 100))
+
+    def test_unsatisfiable_ranges(self):
+        with self.assertRaises(ValueError):
+            parse_range('bytes=100-', 100)
+        with self.assertRaises(ValueError):
+            parse_range('bytes=9-0', 100)
+
+
+class RangeResponseTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(bytes(range(100)))
+        stat = os.stat(self.path)
+        self.etag = file_etag(stat)
+        self.last_modified = http_date(int(stat.st_mtime))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def get(self, **headers):
+        return range_response(self.factory.get('/', **headers), self.path, 'application/octet-stream')
+
+    def content(self, response):
+        content = b''.join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.content(response), bytes(range(100)))
+
+    def test_partial_content(self):
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(self.content(response), bytes(range(10, 20)))
+
+    def test_unsatisfiable_range(self):
+        response = self.get(HTTP_RANGE='bytes=200-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_if_range_matching_etag_or_date(self):
+        for if_range in (self.etag, self.last_modified):
+            response = self.get(HTTP_RANGE='bytes=0-4', HTTP_IF_RANGE=if_range)
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(self.content(response), bytes(range(5)))
+
+    def test_if_range_not_matching_sends_the_whole_file(self):
+        for if_range in ('"stale"', 'Thu, 01 Jan 1970 00:00:00 GMT'):
+            response = self.get(HTTP_RANGE='bytes=0-4', HTTP_IF_RANGE=if_range)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.content(response), bytes(range(100)))
+
+    def test_not_modified(self):
+        response = self.get(HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
@@ -1,3 +1,42 @@
-from django.shortcuts import render
+from wsgiref.util import FileWrapper
 
-# Create your views here.
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from wagtail.core import hooks
+from wagtail.documents.models import document_served, get_document_model
+
+from blog.documents import content_disposition, serve_file
+
+
+# Same checks as wagtail.documents.views.serve.serve, files on the local
+# filesystem are then handed to blog.documents.serve_file
+def serve_document(request, document_id, document_filename):
+    Document = get_document_model()
+    doc = get_object_or_404(Document, id=document_id)
+
+    # We want to ensure that the document filename provided in the URL matches the one associated with the considered document_id.
+    if doc.filename != document_filename:
+        raise Http404('This document does not match the given filename.')
+
+    for fn in hooks.get_hooks('before_serve_document'):
+        result = fn(doc, request)
+        if isinstance(result, HttpResponse):
+            return result
+
+    # Send document_served signal
+    document_served.send(sender=Document, instance=doc, request=request)
+
+    try:
+        local_path = doc.file.path
+    except NotImplementedError:
+        local_path = None
+
+    if local_path:
+        return serve_file(request, doc, local_path)
+
+    # Storage backends without filesystem paths are streamed like Wagtail does
+    wrapper = FileWrapper(doc.file)
+    response = StreamingHttpResponse(wrapper, content_type='application/octet-stream')
+    response['Content-Disposition'] = content_disposition(doc.filename)
+    response['Content-Length'] = doc.file.size
+    return response
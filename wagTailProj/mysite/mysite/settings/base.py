@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'blog',
+    'renditions',
     'widget_tweaks',
 ]
 
@@ -155,6 +156,20 @@ MEDIA_URL = '/media/'
 
 WAGTAIL_SITE_NAME = "mysite"
 
+# Full-text search on the project's SQLite database, run "./manage.py update_index" after switching
+WAGTAILSEARCH_BACKENDS = {
+    'default': {
+        'BACKEND': 'sqlitefts.backends',
+    }
+}
+
+# Image fields of our pages and the filter specs the templates render them at. Renditions are
+# queued when a page is published or an image uploaded and generated by a background thread
+# of the web process, "./manage.py prewarm_renditions --all" backfills the image library
+RENDITION_SPECS = {
+    'gallery_images.image': ['fill-160x100', 'fill-320x240'],
+}
+
 # Base URL to use when referring to full URLs within the Wagtail admin backend -
 # e.g. in notification emails. Don't include '/admin' or a trailing slash
 BASE_URL = 'http://example.com'
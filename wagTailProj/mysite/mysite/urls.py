@@ -6,12 +6,15 @@ from wagtail.admin import urls as wagtailadmin_urls
 from wagtail.core import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
 
+from blog import views as blog_views
 from search import views as search_views
 
 urlpatterns = [
     url(r'^django-admin/', admin.site.urls),
 
     url(r'^admin/', include(wagtailadmin_urls)),
+    # served by blog.views so large files can use X-Accel-Redirect/X-Sendfile or Range requests
+    url(r'^documents/(\d+)/(.*)$', blog_views.serve_document, name='wagtaildocs_serve'),
     url(r'^documents/', include(wagtaildocs_urls)),
 
     url(r'^search/$', search_views.search, name='search'),
@@ -0,0 +1,15 @@
+from django.db import models
+
+
+"""A rendition waiting to be generated, see renditions/prewarm.py.
+
+Rows are only ever inserted by requests and deleted once generated, the
+same image and spec may be queued more than once.
+"""
+class PendingRendition(models.Model):
+    image_id = models.PositiveIntegerField()
+    filter_spec = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return '%s of image %s' % (self.filter_spec, self.image_id)
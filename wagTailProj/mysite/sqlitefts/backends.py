@@ -0,0 +1,231 @@
+import re
+
+from django.db import connection
+from django.utils.html import strip_tags
+from wagtail.search.backends.base import BaseSearchResults
+from wagtail.search.backends.db import DatabaseSearchBackend
+from wagtail.search.index import SearchField
+
+# bm25 weights of the title and body columns
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+RE_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+# pages of every type share the wagtailcore_page ids, so one table per root model is enough
+def get_root_model(model):
+    while model._meta.parents:
+        model = next(iter(model._meta.parents))
+    return model
+
+
+# turn a user query into an FTS5 query, every term is quoted so no FTS5 syntax leaks through
+def build_match(query_string, operator=None, partial_match=True, title_only=False):
+    terms = RE_TERM.findall(query_string)
+    if not terms:
+        return None
+    terms = ['"%s"%s' % (term, '*' if partial_match else '') for term in terms]
+    match = (' AND ' if operator == 'and' else ' OR ').join(terms)
+    if title_only:
+        match = 'title : (%s)' % match
+    return match
+
+
+"""FTS5 table holding title and body text of one root model, rowid is the object pk"""
+class SQLiteFTSIndex(object):
+
+    def __init__(self, root_model):
+        self.root_model = root_model
+        self.name = 'search_fts_%s' % root_model._meta.db_table
+        self.created = False
+
+    def exists(self):
+        if not self.created:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.name])
+                self.created = cursor.fetchone() is not None
+        return self.created
+
+    def add_model(self, model):
+        if self.created:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5(title, body, tokenize='porter unicode61')" % self.name
+            )
+        self.created = True
+
+    def reset(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS %s' % self.name)
+        self.created = False
+        self.add_model(self.root_model)
+
+    def refresh(self):
+        pass
+
+    def get_document(self, obj):
+        title = []
+        body = []
+        for field in obj.get_search_fields():
+            if not isinstance(field, SearchField):
+                continue
+            value = field.get_value(obj)
+            if value is None:
+                continue
+            value = strip_tags(str(value))
+            if field.field_name == 'title':
+                title.append(value)
+            else:
+                body.append(value)
+        return ' '.join(title), ' '.join(body)
+
+    def add_items(self, model, objs):
+        self.add_model(model)
+        rows = []
+        for obj in objs:
+            title, body = self.get_document(obj)
+            rows.append([obj.pk, title, body])
+        with connection.cursor() as cursor:
+            cursor.executemany('DELETE FROM %s WHERE rowid = %%s' % self.name, [[row[0]] for row in rows])
+            cursor.executemany('INSERT INTO %s (rowid, title, body) VALUES (%%s, %%s, %%s)' % self.name, rows)
+
+    def add_item(self, obj):
+        self.add_items(type(obj), [obj])
+
+    def delete_item(self, obj):
+        if self.exists():
+            with connection.cursor() as cursor:
+                cursor.execute('DELETE FROM %s WHERE rowid = %%s' % self.name, [obj.pk])
+
+    # join the queryset with the matching rows of the index, ranked by bm25 when asked for
+    def filter(self, queryset, match, order_by_relevance=True):
+        model = queryset.model
+        pk_column = '%s.%s' % (
+            connection.ops.quote_name(model._meta.db_table), connection.ops.quote_name(model._meta.pk.column)
+        )
+        queryset = queryset.extra(
+            tables=[self.name],
+            where=['%s MATCH %%s' % self.name, '%s.rowid = %s' % (self.name, pk_column)],
+            params=[match],
+        )
+        if order_by_relevance:
+            queryset = queryset.extra(select={'_fts_rank': self.rank_sql()}, order_by=['_fts_rank'])
+        return queryset
+
+    # bm25 is lower for better matches
+    def rank_sql(self):
+        return 'bm25(%s, %s, %s)' % (self.name, TITLE_WEIGHT, BODY_WEIGHT)
+
+
+class SQLiteFTSRebuilder(object):
+
+    def __init__(self, index):
+        self.index = index
+
+    def start(self):
+        self.index.reset()
+        return self.index
+
+    def finish(self):
+        pass
+
+
+class SQLiteFTSSearchResults(BaseSearchResults):
+
+    def __init__(self, backend, queryset, index):
+        super(SQLiteFTSSearchResults, self).__init__(backend, None)
+        self.queryset = queryset
+        self.index = index
+
+    def _clone(self):
+        new = self.__class__(self.backend, self.queryset, self.index)
+        new.start = self.start
+        new.stop = self.stop
+        new._score_field = self._score_field
+        return new
+
+    def get_queryset(self):
+        queryset = self.queryset
+        if self._score_field:
+            queryset = queryset.extra(select={self._score_field: '-' + self.index.rank_sql()})
+        return queryset[self.start:self.stop]
+
+    def _do_search(self):
+        return list(self.get_queryset())
+
+    def _do_count(self):
+        return self.get_queryset().count()
+
+
+"""
+Search backend keeping an SQLite FTS5 table per root model.
+
+Matching and bm25 ranking run inside SQLite joined with the searched
+queryset, so filters like live() still apply. Other databases, query objects
+and indexes that were never built fall back to the database backend.
+Run `manage.py update_index` once to build the tables.
+"""
+class SQLiteFTSSearchBackend(DatabaseSearchBackend):
+    rebuilder_class = SQLiteFTSRebuilder
+
+    def __init__(self, params):
+        super(SQLiteFTSSearchBackend, self).__init__(params)
+        self.indexes = {}
+
+    def get_index_for_model(self, model):
+        root_model = get_root_model(model)
+        if root_model not in self.indexes:
+            self.indexes[root_model] = SQLiteFTSIndex(root_model)
+        return self.indexes[root_model]
+
+    def reset_index(self):
+        for index in self.indexes.values():
+            index.reset()
+
+    def add_type(self, model):
+        if connection.vendor == 'sqlite':
+            self.get_index_for_model(model).add_model(model)
+
+    def refresh_index(self):
+        pass
+
+    def add(self, obj):
+        if connection.vendor == 'sqlite':
+            self.get_index_for_model(type(obj)).add_item(obj)
+
+    def add_bulk(self, model, obj_list):
+        if connection.vendor == 'sqlite':
+            self.get_index_for_model(model).add_items(model, obj_list)
+
+    def delete(self, obj):
+        if connection.vendor == 'sqlite':
+            self.get_index_for_model(type(obj)).delete_item(obj)
+
+    def search(self, query_string, model_or_queryset, **kwargs):
+        if connection.vendor != 'sqlite' or not isinstance(query_string, str):
+            return super(SQLiteFTSSearchBackend, self).search(query_string, model_or_queryset, **kwargs)
+
+        queryset = model_or_queryset
+        if not hasattr(queryset, 'model'):
+            queryset = queryset.objects.all()
+        index = self.get_index_for_model(queryset.model)
+        if not index.exists():
+            return super(SQLiteFTSSearchBackend, self).search(query_string, model_or_queryset, **kwargs)
+
+        fields = kwargs.get('fields')
+        match = build_match(
+            query_string,
+            operator=kwargs.get('operator'),
+            partial_match=kwargs.get('partial_match', True),
+            title_only=bool(fields) and set(fields) == {'title'},
+        )
+        if match is None:
+            queryset = queryset.none()
+        else:
+            queryset = index.filter(queryset, match, order_by_relevance=kwargs.get('order_by_relevance', True))
+        return SQLiteFTSSearchResults(self, queryset, index)
+
+
+SearchBackend = SQLiteFTSSearchBackend
@@ -0,0 +1,58 @@
+"""Copy the shared packages from myblog to mysite, see README.md.
+
+    python sync_shared.py          copy every changed file
+    python sync_shared.py --check  only list the files that differ, exit 1 if any do
+"""
+import filecmp
+import os
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE = 'myblog'
+COPIES = ['mysite']
+PACKAGES = ['renditions', 'sqlitefts']
+
+
+# (source, copy) of every file of the shared packages, files only in a copy are listed with source None
+def shared_files():
+    for package in PACKAGES:
+        source_root = os.path.join(ROOT, SOURCE, package)
+        for project in COPIES:
+            copy_root = os.path.join(ROOT, project, package)
+            seen = set()
+            for directory, dirs, files in os.walk(source_root):
+                dirs[:] = [name for name in dirs if name != '__pycache__']
+                for name in files:
+                    if name.endswith('.py'):
+                        relative = os.path.relpath(os.path.join(directory, name), source_root)
+                        seen.add(relative)
+                        yield os.path.join(source_root, relative), os.path.join(copy_root, relative)
+            for directory, dirs, files in os.walk(copy_root):
+                dirs[:] = [name for name in dirs if name != '__pycache__']
+                for name in files:
+                    relative = os.path.relpath(os.path.join(directory, name), copy_root)
+                    if name.endswith('.py') and relative not in seen:
+                        yield None, os.path.join(copy_root, relative)
+
+
+def differs(source, copy):
+    return source is None or not os.path.exists(copy) or not filecmp.cmp(source, copy, False)
+
+
+def main(check=False):
+    changed = [(source, copy) for source, copy in shared_files() if differs(source, copy)]
+    for source, copy in changed:
+        print(os.path.relpath(copy, ROOT))
+        if check:
+            continue
+        if source is None:
+            os.remove(copy)
+        else:
+            os.makedirs(os.path.dirname(copy), exist_ok=True)
+            shutil.copyfile(source, copy)
+    return 1 if check and changed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(check='--check' in sys.argv[1:]))